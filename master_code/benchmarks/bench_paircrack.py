@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Benchmarks the hot paths of paircrack without wireless hardware
+
+Measures netxml and pcap parse throughput, process spawn overhead and
+AP discovery latency using the replay backend. Results can be saved and
+compared against a previous run to catch regressions.
+"""
+
+import argparse
+import json
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from os import path
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+import paircrack
+from paircrack import fixtures
+
+
+TARGET = ('0E:00:00:00:00:01', 'TARGET-AP', '6')
+
+
+def timeit(func, repeat : int) -> float:
+    """Returns median wall time of func in seconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def bench_netxml(tmpdir : str, repeat : int) -> dict:
+    """Parse throughput of netxml files of increasing size"""
+    airodump = paircrack.Airodump(0, paircrack.ArtifactManager(tmpdir))
+    results = {}
+    for count in (50, 500):
+        filepath = path.join(tmpdir, f'aps{count}.kismet.netxml')
+        fixtures.write_netxml(filepath, fixtures.random_networks(count, target=TARGET))
+
+        results[f'netxml.parse_aps.{count}'] = timeit(
+            lambda: airodump.parse_aps_netxml(filepath), repeat)
+        results[f'netxml.find_ap_last.{count}'] = timeit(
+            lambda: airodump.find_ap_netxml(filepath, TARGET[1]), repeat)
+        results[f'netxml.parse_clients.{count}'] = timeit(
+            lambda: airodump.parse_clients_netxml(filepath, TARGET[0]), repeat)
+
+        aps = airodump.parse_aps_netxml(filepath)
+        assert len(aps) == count + 1 and aps[-1] == TARGET, 'netxml parsed wrong'
+        assert airodump.find_ap_netxml(filepath, TARGET[1]) == TARGET, 'target AP not found'
+        assert airodump.parse_clients_netxml(filepath, TARGET[0]) == [fixtures.bssid(0, '0A:00')], \
+            'target clients parsed wrong'
+
+        db = paircrack.ScanDatabase()
+        results[f'scandb.merge.{count}'] = timeit(
+            lambda: db.merge(airodump.iter_networks_netxml(filepath)), repeat)
+        queries = [f'NET-{i:05}' for i in range(0, count, max(1, count // 100))]
+        results[f'scandb.find_x{len(queries)}.{count}'] = timeit(
+            lambda: [db.find(q) for q in queries], repeat)
+
+        assert len(db.aps) == count + 1, 'scandb merged wrong'
+        assert [db.find(q).essid for q in queries] == queries, 'scandb found wrong AP'
+    return results
+
+
+def bench_eapol(tmpdir : str, repeat : int) -> dict:
+    """Scan throughput of cap files, full and incremental"""
+    ap = bytes.fromhex(TARGET[0].replace(':', ''))
+    sta = bytes.fromhex('0a0000000001')
+    frames = [fixtures.data_frame(ap, sta) for _ in range(20000)]
+    frames[-4:] = fixtures.handshake_frames(ap, sta)
+    filepath = path.join(tmpdir, 'handshake.cap')
+    fixtures.write_pcap(filepath, frames)
+
+    results = {}
+    results['eapol.scan_full.20000'] = timeit(
+        lambda: paircrack.EapolScanner(filepath).has_handshake(TARGET[0]), repeat)
+
+    scanner = paircrack.EapolScanner(filepath)
+    assert scanner.has_handshake(TARGET[0]), 'handshake not found'
+    fixtures.write_pcap(filepath, frames[:100], append=True)
+    start = time.perf_counter()
+    scanner.scan()
+    results['eapol.scan_incremental.100'] = time.perf_counter() - start
+    assert scanner.offset == path.getsize(filepath), 'cap file not fully scanned'
+    assert scanner.has_handshake(TARGET[0]), 'handshake lost on incremental scan'
+    return results
+
+
+def bench_spawn(repeat : int) -> dict:
+    """Overhead of running tools through ToolExecutor"""
+    executor = paircrack.Aireplay(0)
+    count = 20
+    results = {}
+    results['spawn.run_true'] = timeit(lambda: executor.run(['true']), repeat)
+    results[f'spawn.run_many_true.{count}'] = timeit(
+        lambda: executor.run_many([['true']] * count), repeat)
+    assert executor.run(['true']).returncode == 0, 'run failed'
+    assert [r.returncode for r in executor.run_many([['true']] * count)] == [0] * count, \
+        'run_many failed'
+    with paircrack.ReplayBackend() as backend:
+        backend.respond('aireplay-ng', stdout='replayed')
+        results['spawn.replay_run'] = timeit(lambda: executor.run(['aireplay-ng']), repeat)
+        assert executor.run(['aireplay-ng']).stdout == 'replayed', 'replay not used'
+    return results
+
+
+def bench_discovery(tmpdir : str, repeat : int) -> dict:
+    """Latency from the AP appearing in netxml until search_ap returns"""
+    noise = path.join(tmpdir, 'noise.kismet.netxml')
+    found = path.join(tmpdir, 'found.kismet.netxml')
+    fixtures.write_netxml(noise, fixtures.random_networks(200))
+    fixtures.write_netxml(found, fixtures.random_networks(200, target=TARGET))
+
+    appears = 0.5
+    latencies = []
+    with paircrack.ReplayBackend() as backend:
+        airodump = paircrack.Airodump(0, paircrack.ArtifactManager(tmpdir))
+        for _ in range(repeat):
+            backend.add_capture([(0.0, noise), (appears, found)])
+            start = time.perf_counter()
+            ap = airodump.search_ap('wlan0mon', TARGET[1], proc_timeout=5, poll_interval=0.05)
+            latencies.append(time.perf_counter() - start - appears)
+            assert ap is not None and ap[0] == TARGET[0], 'target AP not discovered'
+    return {'discovery.latency': statistics.median(latencies)}
+
+
+def compare(results : dict, baseline : dict, tolerance : float) -> list:
+    """Returns names of benchmarks slower than baseline by tolerance"""
+    regressions = []
+    for name, seconds in results.items():
+        if name in baseline and seconds > baseline[name] * (1 + tolerance):
+            regressions.append(name)
+    return regressions
+
+
+def main(args):
+    logging.disable(logging.INFO)
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='paircrack-bench-') as tmpdir:
+        results.update(bench_netxml(tmpdir, args.repeat))
+        results.update(bench_eapol(tmpdir, args.repeat))
+        results.update(bench_spawn(args.repeat))
+        results.update(bench_discovery(tmpdir, args.repeat))
+
+    for name, seconds in results.items():
+        print(f'{name:<36}{seconds * 1000:>12.3f} ms')
+
+    if args.save:
+        with open(args.save, 'w') as savefile:
+            json.dump(results, savefile, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as basefile:
+            regressions = compare(results, json.load(basefile), args.tolerance)
+        for name in regressions:
+            print(f'Regression: {name}')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    """ This is executed when run from the command line """
+    parser = argparse.ArgumentParser(description="Benchmark paircrack hot paths")
+
+    parser.add_argument("--repeat", type=int, default=5,
+        help="Repetitions per benchmark, median is reported")
+    parser.add_argument("--save",
+        help="Write results as JSON to this file")
+    parser.add_argument("--baseline",
+        help="JSON file of earlier results to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+        help="Allowed slowdown relative to baseline, by default 0.25")
+
+    args = parser.parse_args()
+    sys.exit(main(args))
@@ -3,4 +3,11 @@ from .aircrack import Aircrack
 from .aireplay import Aireplay
 from .airmon import Airmon 
 from .airodump import Airodump
-from .hostetd import Hostetd
\ No newline at end of file
+from .artifacts import ArtifactManager
+from .capturesession import CaptureSession
+from .eapol import EapolScanner
+from .hostetd import Hostetd
+from .metrics import Span, Tracer, tracer
+from .replay import ReplayBackend
+from .scandb import ScanDatabase, AccessPoint, Station
+from .toolexecutor import ToolResult
\ No newline at end of file
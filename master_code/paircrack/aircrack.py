@@ -1,5 +1,6 @@
 from types import NoneType
 from .toolexecutor import ToolExecutor
+from .eapol import EapolScanner
 import re
 
 class Aircrack(ToolExecutor):
@@ -11,11 +12,16 @@ class Aircrack(ToolExecutor):
     
     toolcomm = 'aircrack-ng'
 
-    # File containing single pw not likely to be found.
-    # Used to check if capfile contains handshake.
-    # File must be created before running program.
-    # This file should probably be created in a init method.
-    testwl = 'testwl.txt' 
+    def __init__(self, loglevel : int):
+        """Initializes class and cache of cap file scanners
+
+        Parameters
+        ----------
+        loglevel : int
+            verbosity of logger
+        """
+        super().__init__(loglevel)
+        self.scanners = {}  # capfile -> EapolScanner
     
     def crack_wpa2(self, targetbssid : str, capfile : str, wordlist='/usr/share/set/src/fasttrack/wordlist.txt') -> str | NoneType:
         """Performs dictionary attack against key if in handshake file
@@ -77,19 +83,50 @@ class Aircrack(ToolExecutor):
         """        
         if not self.check_file_content(capfile): return False
         
-        flags = {
-            '-w': self.testwl,
-            '--bssid': targetbssid,
-        }
-        command = self.compound_command([self.toolcomm, capfile, '-q'], flags)
-        output = self.run(command)
-        
-        if 'KEY NOT FOUND' in output.stdout:
+        if self._get_scanner(capfile).has_handshake(targetbssid):
             self.logger.debug('Handshake discovered in cap file')
             return True
-        elif 'Packets contained no EAPOL data' in output.stderr:
-            self.logger.debug('Handshake not cap file')
-            return False
         else:
-            self.logger.debug(f'Recieved error: {output.stderr}')
+            self.logger.debug('Handshake not in cap file')
             return False
+
+
+    def handshake_messages(self, targetbssid : str, capfile : str) -> set:
+        """Finds which messages of the 4-way handshake are in cap file
+
+        Scanners are kept per cap file, so only packets written since
+        the last call are read.
+
+        Parameters
+        ----------
+        targetbssid : str
+            BSSID of network access point
+        capfile : str
+            Filepath of cap file 
+
+        Returns
+        -------
+        set
+            Set of message numbers (1-4) found for targetbssid
+        """
+        msgs = self._get_scanner(capfile).handshake_messages(targetbssid)
+        self.logger.debug(f'Handshake messages found: {sorted(msgs)}')
+        return msgs
+
+
+    def _get_scanner(self, capfile : str) -> EapolScanner:
+        """Private function getting the cached scanner of cap file
+
+        Parameters
+        ----------
+        capfile : str
+            Filepath of cap file 
+
+        Returns
+        -------
+        EapolScanner
+            Scanner keeping track of how much of capfile is read
+        """
+        if capfile not in self.scanners:
+            self.scanners[capfile] = EapolScanner(capfile)
+        return self.scanners[capfile]
@@ -28,6 +28,52 @@ class Aireplay(ToolExecutor):
         subprocess.CompletedProcess
             The returned output of the subprocess.run function
         """        
+        command = self._deauth_command(interface, ap_bssid, client_bssid)
+        output = self.run(command)
+        return output
+
+
+    def deauth_many(self, interface : str, ap_bssid : str, client_bssids : list, timeout=None) -> list:
+        """Deauthenticates several clients of given AP concurrently
+
+        Parameters
+        ----------
+        interface : str
+            Interface to launch deauthentication frames from
+        ap_bssid : str
+            BSSID of AP
+        client_bssids : list
+            List of str BSSIDs of clients to deauthenticate
+        timeout : int, optional
+            Seconds before each aireplay-ng process is terminated, 
+            by default None
+
+        Returns
+        -------
+        list
+            List of ToolResult in the same order as client_bssids
+        """
+        commands = [self._deauth_command(interface, ap_bssid, cb) for cb in client_bssids]
+        return self.run_many(commands, timeout=timeout)
+
+
+    def _deauth_command(self, interface : str, ap_bssid : str, client_bssid=None) -> list:
+        """Private function building the aireplay-ng deauth command
+
+        Parameters
+        ----------
+        interface : str
+            Interface to launch deauthentication frames from
+        ap_bssid : str
+            BSSID of AP
+        client_bssid : str, optional
+            BSSID of client to deauthenticate, by default None
+
+        Returns
+        -------
+        list
+            list of words of final command
+        """
         flags = {
             '--deauth': '10',
             '-a': ap_bssid
@@ -35,6 +81,4 @@ class Aireplay(ToolExecutor):
         if client_bssid is not None:
             flags['-c'] = client_bssid
         
-        command = self.compound_command([self.toolcomm, interface], flags)
-        output = self.run(command)
-        return output
\ No newline at end of file
+        return self.compound_command([self.toolcomm, interface], flags)
\ No newline at end of file
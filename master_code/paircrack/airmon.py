@@ -1,63 +1,100 @@
-import re
+from types import NoneType
+from os import listdir, path
 from .toolexecutor import ToolExecutor
 
-class Airmon(ToolExecutor): 
+class Airmon(ToolExecutor):
     """Class that runs airmon-ng commands
 
     Capable of identifying interfaces, setting interface to monitor
-    mode by running as context manager.
-    """    
-    
+    mode by running as context manager. The context manager can be
+    re-entered, in which case monitor mode is only set up by the
+    outermost entry and torn down by the outermost exit.
+    """
+
     toolcomm = 'airmon-ng'
-    
-    def __init__(self, loglevel : int): 
-        """Initializes class and sets self.interface 
+
+    # Interface state is read from here instead of parsing airmon-ng
+    sysfs_root = '/sys/class/net'
+
+    # Value of <interface>/type for interfaces in monitor mode
+    # (ARPHRD_IEEE80211_RADIOTAP)
+    monitor_type = '803'
+
+    def __init__(self, loglevel : int):
+        """Initializes class and sets self.interface
 
         Parameters
         ----------
         loglevel : int
             verbosity of logger
-        """        
+        """
         super().__init__(loglevel)
-        
+
         # Sets interface to first interface found. This is a
         # simplification that works because the internal NIC has
         # monitor mode on computer from which this was developed.
         self.interface = self.id_interfaces()[0]
-        
+
         self.csv_data = None
         self._channel = None
+        self._depth = 0         # number of nested context entries
+        self._managed = None    # interface name before monitor mode
 
 
     def __enter__(self):
-        """ Set self.interface to monitor mode 
-        
-        Also kills interfering processes
+        """ Set self.interface to monitor mode
+
+        Also kills interfering processes. Does nothing if monitor mode
+        is already set up by this object, as the channel setter changes
+        the channel of an active session in place.
         """
-        self.run([self.toolcomm, 'check', 'kill'])
-        start_args = [self.toolcomm, 'start', self.interface]
-        if self._channel is not None:
-            start_args.append(self._channel)
-        self.run(start_args)
-        self.interface = f'{self.interface}mon'
+        if self._depth > 0:
+            self._depth += 1
+            return self
+
+        if self.is_monitor(self.interface):
+            self.logger.debug(f'{self.interface} already in monitor mode')
+            self._managed = None
+            self._set_channel()
+        else:
+            with self.tracer.span('monitor.start', interface=self.interface):
+                self.run([self.toolcomm, 'check', 'kill'])
+                start_args = [self.toolcomm, 'start', self.interface]
+                if self._channel is not None:
+                    start_args.append(self._channel)
+                self.run(start_args)
+                self._managed = self.interface
+                self.interface = self._find_monitor(self.interface)
+        # Only counted once set up, so a failed entry is not nested into
+        self._depth = 1
         return self
-    
+
     def __exit__(self, *exc_args):
-        """ Set monitor interface back to managed mode 
-        
-        Also restarts NetworkManager which should set system back to 
-        normal
+        """ Set monitor interface back to managed mode
+
+        Also restarts NetworkManager which should set system back to
+        normal. Only done when leaving the outermost context. Nested
+        contexts let exceptions through to the outermost one.
         """
-        
+
+        self._depth -= 1
+        if self._depth > 0:
+            return False
+
         if exc_args:
             if exc_args[0] is not None:
                 self.logger.exception(f'Exception occured:')
 
-        self.run([self.toolcomm, 'stop', self.interface])
-        self.run(['systemctl', 'restart', 'NetworkManager'])
-        self.interface = self.id_interfaces()[0]
+        if self._managed is None:
+            return True
+
+        with self.tracer.span('monitor.stop', interface=self.interface):
+            self.run([self.toolcomm, 'stop', self.interface])
+            self.run(['systemctl', 'restart', 'NetworkManager'])
+        self.interface = self._managed
+        self._managed = None
         return True
-        
+
 
     @property
     def channel(self) -> str:
@@ -66,6 +103,8 @@ class Airmon(ToolExecutor):
     @channel.setter
     def channel(self, value):
         self._channel = str(value)
+        if self._depth > 0:
+            self._set_channel()
 
 
     def id_interfaces(self) -> list:
@@ -74,16 +113,101 @@ class Airmon(ToolExecutor):
         Returns
         -------
         list
-            a list of strings of interface names
+            a list of strings of interface names, ordered by phy
+        """
+        interfaces = []
+        for iface in listdir(self.sysfs_root):
+            phy = self._phy(iface)
+            if phy is not None:
+                interfaces.append((phy, iface))
+        interfaces.sort(key=lambda phyif: (len(phyif[0]), phyif))
+        return [iface for _, iface in interfaces]
+
+
+    def is_monitor(self, interface : str) -> bool:
+        """Checks if interface is in monitor mode
+
+        Parameters
+        ----------
+        interface : str
+            name of interface
+
+        Returns
+        -------
+        bool
+            True if in monitor mode, otherwise False
+        """
+        return self._read_sysfs(interface, 'type') == self.monitor_type
+
+
+    def _set_channel(self):
+        """Private function setting channel of monitor interface in place
+        """
+        if self._channel is None or not self.is_monitor(self.interface):
+            return
+        self.run(['iw', 'dev', self.interface, 'set', 'channel', self._channel])
+
+
+    def _find_monitor(self, interface : str) -> str:
+        """Private function finding monitor interface created from interface
+
+        airmon-ng usually renames the interface by adding 'mon', but
+        some drivers keep the name. The monitor interface is the one on
+        the same phy that is in monitor mode.
+
+        Parameters
+        ----------
+        interface : str
+            name of interface before monitor mode
+
+        Returns
+        -------
+        str
+            name of monitor interface
+        """
+        if self.is_monitor(interface):
+            return interface
+        phy = self._phy(interface)
+        for iface in self.id_interfaces():
+            if self.is_monitor(iface) and (phy is None or self._phy(iface) == phy):
+                return iface
+        self.logger.debug('Monitor interface not found in sysfs')
+        return f'{interface}mon'
+
+
+    def _phy(self, interface : str) -> str | NoneType:
+        """Private function getting wireless phy of interface
+
+        Parameters
+        ----------
+        interface : str
+            name of interface
+
+        Returns
+        -------
+        str | NoneType
+            phy name, or None if interface is not wireless
+        """
+        return self._read_sysfs(interface, 'phy80211/name')
+
+
+    def _read_sysfs(self, interface : str, attribute : str) -> str | NoneType:
+        """Private function reading attribute of interface from sysfs
+
+        Parameters
+        ----------
+        interface : str
+            name of interface
+        attribute : str
+            relative path of attribute in interface directory
+
+        Returns
+        -------
+        str | NoneType
+            stripped content, or None if attribute does not exist
         """
-        data = self.run([self.toolcomm]).stdout
-        data = re.sub(r"[\t]+", '\t', data)
-        parsed = []
-        for line in data.split('\n'):
-            if line:
-                for i, col in enumerate(line.split('\t')):
-                    if i == 1:
-                        parsed.append(col)
-        return parsed[1:]
-     
-        
+        try:
+            with open(path.join(self.sysfs_root, interface, attribute)) as attrfile:
+                return attrfile.read().strip()
+        except OSError:
+            return None
@@ -1,116 +1,129 @@
 from types import NoneType
 from .toolexecutor import ToolExecutor
+from .capturesession import CaptureSession
+from .scandb import match_key
 
-from os import listdir
+import time
+from functools import lru_cache
 import xml.etree.ElementTree as ET
 
 
 class Airodump(ToolExecutor):
     """Class that runs airodump-ng commands
 
-    Capable of capturing APs, clients of APs and handshakes. Can also
-    parse its output files to get APs and clients in a more workable
-    format.
+    Captures APs, clients of APs and handshakes in long-lived capture
+    sessions. Can also parse its output files to get APs and clients in
+    a more workable format.
     """    
     
     toolcomm = 'airodump-ng'
     
-    def capture_aps(self, interface : str, proc_timeout=2) -> str:
-        """Captures all access points within range
+    def search_ap(self, interface : str, ap_query : str, proc_timeout=10, poll_interval=0.5, db=None) -> tuple | NoneType:
+        """Captures access points until one matches ap_query
+
+        The netxml file is rewritten by airodump-ng every second, and
+        is searched each time it changes. The capture stops as soon as
+        a matching AP is seen instead of running for the full timeout.
+        The last snapshot is then merged into the ScanDatabase.
 
         Parameters
         ----------
         interface : str
             Interface to capture packets on
+        ap_query : str
+            ESSID or BSSID, or part of it, of the AP to search for
         proc_timeout : int, optional
-            How long to run the capture, by default 2
+            Maximum amount of seconds to search, by default 10
+        poll_interval : float, optional
+            Seconds between checks of the netxml file, by default 0.5
+        db : ScanDatabase, optional
+            Database to merge captured APs into, by default None
 
         Returns
         -------
-        str
-            filepath to xml file containing AP data
-        """        
-        self.logger.debug('Capturing all APs...')
-        
-        fsuffix = []
-        flags = {
-            '--write-interval': '1',
-            '--output-format': 'netxml'}
-        return self._capture(interface, fsuffix, flags, proc_timeout)
-        
-    def capture_clients(self, interface : str, targetbssid : str, targetchannel : str, proc_timeout=15) -> list:
-        """Captures clients and handshake of given access point network
+        tuple | NoneType
+            Tuple of AP data (BSSID, ESSID, Channel) if found.
+            Otherwise None
+        """
+        self.logger.debug(f'Searching for AP matching <{ap_query}>...')
+
+        with self.session(interface, pcap=False, db=db) as session:
+            ap = session.find_ap(ap_query, proc_timeout, poll_interval)
+        # airodump-ng writes the file a final time when terminated
+        session.update()
+        if ap is None:
+            ap = session.db.find(ap_query)
+            ap = None if ap is None else ap.as_tuple()
+        return ap
+
+
+    def session(self, interface : str, channel=None, bssid=None, pcap=True, db=None) -> CaptureSession:
+        """Creates a long-lived capture session
+
+        The session is started when entered as context manager, or by
+        calling its start method.
 
         Parameters
         ----------
         interface : str
-            Interface to capture packets on 
-        targetbssid : str
-            BSSID of access point
-        targetchannel : str
-            Channel the AP transmits on
-        proc_timeout : int, optional
-            Amount of seconds to run the capture, by default 15
+            Interface to capture packets on
+        channel : str | int, optional
+            Channel to lock the capture to, by default None
+        bssid : str, optional
+            BSSID of AP to filter the capture on, by default None
+        pcap : bool, optional
+            Whether packets are written to a cap file, by default True
+        db : ScanDatabase, optional
+            Database to merge captured APs and clients into. If None,
+            the session creates its own. By default None
 
         Returns
         -------
-        list
-            list of strings with filepaths where the first is an XML of
-            AP and client data, and the second is a cap file of packets
-        """        
-        self.logger.debug('Capturing specific AP data...')  
-        
-        fsuffix = ['cap']   
-        flags = {
-            '--output-format': 'pcap,netxml',
-            '--bssid': targetbssid,
-            '--channel': targetchannel}
-        return self._capture(interface, fsuffix, flags, proc_timeout)
-    
-    
-    def _capture(self, interface : str, fsuffix : list, flags : dict, proc_timeout : int) -> str | list:
-        """Private function to support capture_aps and capture_clients
+        CaptureSession
+            Session object that can be queried for APs, clients and
+            the cap file while capturing
+        """
+        return CaptureSession(self, interface, channel, bssid, pcap, db)
+
+
+    def _launch(self, interface : str, fsuffix : list, flags : dict) -> tuple:
+        """Private function that starts airodump-ng without waiting
 
         Parameters
         ----------
         interface : str
-            Interface to capture packets on 
+            Interface to capture packets on
         fsuffix : list
             List containing all suffixes of output files
         flags : dict
             Flags or commands to run with the process
-        proc_timeout : int
-            Amount of seconds the process should run
 
         Returns
         -------
-        str | list
-            Returns str of filepath if only one file, otherwise list
-        """        
-        fsuffix = ['kismet.netxml'] + fsuffix
-        fprefix = 'dump'        
-        
+        tuple
+            First element is the process, second is the str of filepath
+            if only one file, otherwise list
+        """
+        # airodump-ng adds -01 to new prefixes, which are unique per run
+        fprefix = self.artifacts.prefix('dump')
+        filepaths = [f'{fprefix}-01.{suffix}' for suffix in ['kismet.netxml'] + fsuffix]
+        # Active until released, so captures still running are kept
+        self.artifacts.track(*filepaths, active=True)
+        self.artifacts.enforce_quota()
+
         flags = {
             '--background': '1',
-            '--write': f'{self.folderpath}/{fprefix}',
+            '--write': fprefix,
             **flags}
 
-        command = self.compound_command([self.toolcomm, interface], flags)        
-        self.run(command, timeout=proc_timeout)
-        
-        filenum = sum(filename.startswith(fprefix) and filename.endswith(fsuffix[0]) 
-                      for filename in listdir(self.folderpath))
-        filepaths = []
-        for suffix in fsuffix:
-            filepaths.append(f'{self.folderpath}/{fprefix}-{filenum:0>2}.{suffix}')
-        
+        command = self.compound_command([self.toolcomm, interface], flags)
+        proc = self.spawn(command)
         if len(filepaths) == 1:
-            return filepaths[0]
+            return proc, filepaths[0]
         else:
-            return filepaths
-    
-    
-    
+            return proc, filepaths
+
+
     def parse_aps_netxml(self, filepath : str) -> list | NoneType:
         """Parses XML file from airodump-ng to get access point data
 
@@ -128,21 +141,131 @@ class Airodump(ToolExecutor):
         if not self.check_file_content(filepath):
             self.logger.error('File error')
             return None
-        xmlroot = ET.parse(filepath).getroot()
-        
-        aps = []
-        for netw in xmlroot:
-            try:
-                essid = netw.find('SSID').find('essid').text
-                bssid = netw.find('BSSID').text
-                channel = netw.find('channel').text
-            except AttributeError:
+        return list(self._iter_aps_netxml(filepath))
+
+
+    def find_ap_netxml(self, filepath : str, ap_query : str) -> tuple | NoneType:
+        """Searches XML file from airodump-ng for AP matching ap_query
+
+        APs are ranked by scandb.match_key, like ScanDatabase.find does,
+        so polling a snapshot and querying the merged database pick the
+        same AP. Parsing stops at an exact BSSID match, as no other AP
+        can rank higher.
+
+        Parameters
+        ----------
+        filepath : str
+            Filepath to XML file
+        ap_query : str
+            ESSID or BSSID, or part of it, of the AP to search for
+
+        Returns
+        -------
+        tuple | NoneType
+            Tuple of AP data (BSSID, ESSID, Channel) if found.
+            Otherwise None
+        """
+        if not self.check_file_content(filepath):
+            return None
+
+        best, best_key = None, None
+        for ap, netw in self._iter_netxml(filepath):
+            key = match_key(ap_query, *ap[:2], _netxml_signal(netw))
+            if key is None:
                 continue
-            else:
-                aps.append((bssid, essid, channel))
-        return aps
+            if best_key is None or key < best_key:
+                best, best_key = ap, key
+                if key[0] == 0:
+                    break
+        return best
+
+
+    def _iter_aps_netxml(self, filepath : str):
+        """Private generator yielding APs of XML file as they are parsed
+
+        Parameters
+        ----------
+        filepath : str
+            Filepath to XML file
+
+        Yields
+        ------
+        tuple
+            AP in the format (BSSID, ESSID, Channel)
+        """
+        for ap, _ in self._iter_netxml(filepath):
+            yield ap
+
+
+    def _iter_netxml(self, filepath : str):
+        """Private generator yielding network elements as they are parsed
+
+        airodump-ng may be rewriting the file while it is read. A
+        truncated file ends the iteration instead of raising. Each
+        element is cleared when the next one is requested, so it must
+        be read before that.
+
+        Parameters
+        ----------
+        filepath : str
+            Filepath to XML file
+
+        Yields
+        ------
+        tuple
+            Tuple of AP in the format (BSSID, ESSID, Channel), and its
+            wireless-network element
+        """
+        try:
+            for _, netw in ET.iterparse(filepath, events=('end',)):
+                if netw.tag != 'wireless-network':
+                    continue
+                try:
+                    essid = netw.find('SSID').find('essid').text
+                    bssid = netw.find('BSSID').text
+                    channel = netw.find('channel').text
+                except AttributeError:
+                    netw.clear()
+                    continue
+                try:
+                    yield (bssid, essid, channel), netw
+                finally:
+                    netw.clear()
+        except ET.ParseError:
+            self.logger.debug(f'File <{filepath}> incomplete, parsed partially')
     
     
+    def iter_networks_netxml(self, filepath : str):
+        """Generator yielding APs with signal, times and clients
+
+        Parses the XML file incrementally like _iter_aps_netxml, but
+        includes the data kept by ScanDatabase.
+
+        Parameters
+        ----------
+        filepath : str
+            Filepath to XML file
+
+        Yields
+        ------
+        tuple
+            AP in the format (BSSID, ESSID, Channel, signal, first_seen,
+            last_seen, clients), where signal is last signal in dBm or
+            None, times are epoch seconds and clients is a list of
+            tuples (MAC, signal, first_seen, last_seen)
+        """
+        if not self.check_file_content(filepath):
+            return
+        for ap, netw in self._iter_netxml(filepath):
+            first, last = _netxml_times(netw)
+            clients = []
+            for client in netw.iterfind('wireless-client'):
+                mac = client.findtext('client-mac')
+                if mac is not None:
+                    clients.append((mac, _netxml_signal(client), *_netxml_times(client)))
+            yield (*ap, _netxml_signal(netw), first, last, clients)
+
+
     def parse_clients_netxml(self, filepath : str, ap_bssid : str) -> list:
         """Parses XML file from airodump-ng to get clients of given AP
 
@@ -172,6 +295,29 @@ class Airodump(ToolExecutor):
                     clients.append(client.find('client-mac').text)
                 break
         return clients
-    
 
-        
\ No newline at end of file
+
+@lru_cache(maxsize=1024)
+def _netxml_time(timestr : str) -> float:
+    """Converts time attribute of netxml element to epoch seconds"""
+    return time.mktime(time.strptime(timestr, '%a %b %d %H:%M:%S %Y'))
+
+
+def _netxml_times(elem : ET.Element) -> tuple:
+    """Gets (first_seen, last_seen) of netxml element, now if missing"""
+    now = time.time()
+    try:
+        first = _netxml_time(elem.get('first-time'))
+        last = _netxml_time(elem.get('last-time'))
+    except (TypeError, ValueError):
+        return now, now
+    return first, last
+
+
+def _netxml_signal(elem : ET.Element) -> int | NoneType:
+    """Gets last signal in dBm of netxml element, None if missing"""
+    signal = elem.findtext('snr-info/last_signal_dbm')
+    try:
+        return int(signal)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,226 @@
+from os import getpid, listdir, makedirs, path, remove, rmdir, stat
+import logging
+import time
+
+
+class ArtifactManager():
+    """Keeps track of files written by the tools during a run
+
+    Every run gets its own directory below basedir, and files are given
+    explicit names instead of being numbered by scanning the directory.
+    The total size of tracked files, including those of earlier runs,
+    is kept below a quota by deleting the oldest files first. Files
+    still being written by a running tool are tracked as active and
+    are never deleted.
+    """
+
+    def __init__(self, basedir : str, quota_mb=500):
+        """Creates the run directory
+
+        Parameters
+        ----------
+        basedir : str
+            Directory the run directories are created in
+        quota_mb : int, optional
+            Maximum total size of tracked files in MB. None disables
+            the quota. By default 500
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.basedir = basedir
+        self.quota = None if quota_mb is None else int(quota_mb * 1024**2)
+
+        runname = f'run-{time.strftime("%Y%m%d-%H%M%S")}-{getpid()}'
+        self.rundir = path.join(basedir, runname)
+        makedirs(self.rundir, exist_ok=True)
+
+        # tracked paths mapped to size in bytes, None if not yet
+        # written, oldest first
+        self.files = dict(self._previous_files())
+        self.total = sum(self.files.values())   # bytes of all tracked files
+        self._active = set()     # files still being written
+        self._unsized = set()    # files not written when last checked
+        self._counters = {}
+
+
+    def prefix(self, name : str) -> str:
+        """Gets a new unique path prefix in the run directory
+
+        Parameters
+        ----------
+        name : str
+            Name of the output, e.g. 'dump'
+
+        Returns
+        -------
+        str
+            Path prefix numbered by how many times name is requested
+        """
+        self._counters[name] = self._counters.get(name, 0) + 1
+        return path.join(self.rundir, f'{name}{self._counters[name]:0>2}')
+
+
+    def path(self, filename : str) -> str:
+        """Gets path of filename in the run directory and tracks it
+
+        Parameters
+        ----------
+        filename : str
+            Name of file
+
+        Returns
+        -------
+        str
+            Absolute filepath
+        """
+        filepath = path.join(self.rundir, filename)
+        self.track(filepath)
+        return filepath
+
+
+    def track(self, *filepaths : str, active=False):
+        """Adds files to be counted against the quota
+
+        The files do not need to exist yet. Their size is read once
+        they are written, or on every check while they are active.
+
+        Parameters
+        ----------
+        *filepaths : str
+            Filepaths of files written by a tool
+        active : bool, optional
+            Whether the files are still being written, e.g. by a
+            running capture. Active files are never deleted until
+            released. By default False
+        """
+        for filepath in filepaths:
+            if filepath not in self.files:
+                self.files[filepath] = None
+                self._unsized.add(filepath)
+            if active:
+                self._active.add(filepath)
+
+
+    def release(self, *filepaths : str):
+        """Marks active files as complete, so the quota may delete them
+
+        Parameters
+        ----------
+        *filepaths : str
+            Filepaths given to track as active
+        """
+        for filepath in filepaths:
+            if filepath in self._active:
+                self._active.discard(filepath)
+                self._unsized.add(filepath)     # read final size once
+
+
+    def usage(self) -> int:
+        """Gets total size of tracked files
+
+        Returns
+        -------
+        int
+            Size in bytes
+        """
+        self._refresh()
+        return self.total
+
+
+    def enforce_quota(self, keep=()) -> list:
+        """Deletes oldest tracked files until total size is within quota
+
+        Only active files and files not yet written are checked on
+        disk, the sizes of other files are known.
+
+        Parameters
+        ----------
+        keep : iterable, optional
+            Filepaths that must not be deleted besides active files.
+            By default ()
+
+        Returns
+        -------
+        list
+            Filepaths of deleted files
+        """
+        if self.quota is None:
+            return []
+
+        self._refresh()
+        excess = self.total - self.quota
+        victims = []
+        for filepath, size in self.files.items():
+            if excess <= 0:
+                break
+            if not size or filepath in self._active or filepath in keep:
+                continue
+            victims.append(filepath)
+            excess -= size
+
+        for filepath in victims:
+            try:
+                remove(filepath)
+            except FileNotFoundError:
+                pass
+            self.total -= self.files.pop(filepath)
+            self._remove_empty_dir(path.dirname(filepath))
+
+        if victims:
+            self.logger.debug(f'Deleted {len(victims)} files to stay within quota')
+        return victims
+
+
+    def _refresh(self):
+        """Private function reading sizes of files that may have changed
+        """
+        for filepath in self._active | self._unsized:
+            try:
+                size = stat(filepath).st_size
+            except FileNotFoundError:
+                continue
+            self.total += size - (self.files[filepath] or 0)
+            self.files[filepath] = size
+            self._unsized.discard(filepath)
+
+
+    def _previous_files(self) -> list:
+        """Private function finding files left by earlier runs
+
+        Only run directories are scanned, once, when the manager is
+        created.
+
+        Returns
+        -------
+        list
+            List of tuples (filepath, size in bytes), sorted by
+            modification time, oldest first
+        """
+        files = []
+        for dirname in listdir(self.basedir):
+            dirpath = path.join(self.basedir, dirname)
+            if not dirname.startswith('run-') or dirpath == self.rundir:
+                continue
+            try:
+                for filename in listdir(dirpath):
+                    filepath = path.join(dirpath, filename)
+                    fstat = stat(filepath)
+                    files.append((fstat.st_mtime, filepath, fstat.st_size))
+            except NotADirectoryError:
+                continue
+        return [(filepath, size) for _, filepath, size in sorted(files)]
+
+
+    def _remove_empty_dir(self, dirpath : str):
+        """Private function removing a run directory left empty
+
+        Parameters
+        ----------
+        dirpath : str
+            Directory of a deleted file
+        """
+        if dirpath == self.rundir:
+            return
+        try:
+            rmdir(dirpath)
+        except OSError:
+            pass
@@ -0,0 +1,241 @@
+from types import NoneType
+from os import stat
+import time
+
+from .scandb import ScanDatabase
+
+
+class CaptureSession():
+    """Long-lived airodump-ng capture on one interface and channel
+
+    The airodump-ng process is started once and keeps rewriting its
+    netxml file every second while appending packets to its cap file.
+    APs, clients and the cap file can be queried at any time without
+    relaunching the process. Each new netxml snapshot is merged into a
+    ScanDatabase, which may be shared between sessions. Runs as context
+    manager.
+    """
+
+    def __init__(self, airodump, interface : str, channel=None, bssid=None, pcap=True, db=None):
+        """Initializes the session without starting the capture
+
+        Parameters
+        ----------
+        airodump : Airodump
+            Object used to launch airodump-ng and parse its output
+        interface : str
+            Interface to capture packets on
+        channel : str | int, optional
+            Channel to lock the capture to. If None, airodump-ng hops
+            between channels. By default None
+        bssid : str, optional
+            BSSID of AP to filter the capture on, by default None
+        pcap : bool, optional
+            Whether packets are written to a cap file, by default True
+        db : ScanDatabase, optional
+            Database snapshots are merged into. If None, a new one is
+            created. By default None
+        """
+        self.airodump = airodump
+        self.logger = airodump.logger
+        self.interface = interface
+        self.channel = None if channel is None else str(channel)
+        self.bssid = bssid
+        self.pcap = pcap
+        self.db = ScanDatabase() if db is None else db
+        self._merged_mtime = None
+
+        self.proc = None
+        self.netxml = None
+        self.capfile = None
+
+
+    def __enter__(self):
+        """Starts the capture"""
+        self.start()
+        return self
+
+    def __exit__(self, *exc_args):
+        """Stops the capture"""
+        self.close()
+
+
+    def start(self):
+        """Launches airodump-ng writing netxml and optionally cap files
+        """
+        if self.running:
+            return
+
+        fsuffix = ['cap'] if self.pcap else []
+        flags = {
+            '--write-interval': '1',
+            '--output-format': 'pcap,netxml' if self.pcap else 'netxml'}
+        if self.channel is not None:
+            flags['--channel'] = self.channel
+        if self.bssid is not None:
+            flags['--bssid'] = self.bssid
+
+        self.logger.debug(f'Starting capture session on {self.interface}...')
+        self.proc, filepaths = self.airodump._launch(self.interface, fsuffix, flags)
+        if self.pcap:
+            self.netxml, self.capfile = filepaths
+        else:
+            self.netxml = filepaths
+
+
+    def close(self):
+        """Terminates airodump-ng. Output files are kept
+        """
+        if self.proc is not None:
+            self.logger.debug(f'Closing capture session on {self.interface}...')
+            self.airodump.stop(self.proc)
+            self.airodump.artifacts.release(self.netxml, *([self.capfile] if self.pcap else []))
+            self.proc = None
+
+
+    @property
+    def running(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+
+    def update(self) -> ScanDatabase:
+        """Merges the netxml file into self.db if rewritten since last call
+
+        Each new snapshot also enforces the artifact quota, since the
+        cap file keeps growing while the session runs. Files of running
+        sessions are active in the ArtifactManager and never deleted.
+
+        Returns
+        -------
+        ScanDatabase
+            Database with all APs and clients seen so far
+        """
+        mtime = self._mtime()
+        if mtime is not None and mtime != self._merged_mtime:
+            self._merged_mtime = mtime
+            self.db.merge(self.airodump.iter_networks_netxml(self.netxml))
+            self.airodump.artifacts.enforce_quota()
+        return self.db
+
+
+    def aps(self) -> list:
+        """Gets the APs captured so far
+
+        Returns
+        -------
+        list
+            List of tuples where each is an AP in the format (BSSID,
+            ESSID, Channel)
+        """
+        return [ap.as_tuple() for ap in self.update().aps.values()]
+
+
+    def clients(self, ap_bssid : str) -> list:
+        """Gets the clients of given AP captured so far
+
+        Parameters
+        ----------
+        ap_bssid : str
+            BSSID of the AP
+
+        Returns
+        -------
+        list
+            List of BSSIDs of captured clients
+        """
+        return self.update().clients(ap_bssid)
+
+
+    def find_ap(self, ap_query : str, timeout=10, poll_interval=0.5) -> tuple | NoneType:
+        """Waits until an AP matching ap_query is captured
+
+        Each snapshot is searched with Airodump.find_ap_netxml, which
+        stops parsing at an exact match, instead of being merged into
+        self.db. Call update to merge it.
+
+        Parameters
+        ----------
+        ap_query : str
+            ESSID or BSSID, or part of it, of the AP to search for
+        timeout : int, optional
+            Maximum amount of seconds to wait, by default 10
+        poll_interval : float, optional
+            Seconds between checks of the netxml file, by default 0.5
+
+        Returns
+        -------
+        tuple | NoneType
+            Tuple of AP data (BSSID, ESSID, Channel) if found.
+            Otherwise None
+        """
+        return self._poll(lambda: self.airodump.find_ap_netxml(self.netxml, ap_query),
+                          timeout, poll_interval)
+
+
+    def wait_for_clients(self, ap_bssid : str, timeout=15, poll_interval=0.5) -> list:
+        """Waits until at least one client of given AP is captured
+
+        Parameters
+        ----------
+        ap_bssid : str
+            BSSID of the AP
+        timeout : int, optional
+            Maximum amount of seconds to wait, by default 15
+        poll_interval : float, optional
+            Seconds between checks of the netxml file, by default 0.5
+
+        Returns
+        -------
+        list
+            List of BSSIDs of captured clients. Empty if none are found
+        """
+        return self._poll(lambda: self.clients(ap_bssid), timeout, poll_interval) or []
+
+
+    def _poll(self, query, timeout : float, poll_interval : float):
+        """Private function that reruns query each time netxml is rewritten
+
+        Parameters
+        ----------
+        query : callable
+            Function without arguments returning a falsy value until
+            the wanted data is captured
+        timeout : float
+            Maximum amount of seconds to wait
+        poll_interval : float
+            Seconds between checks of the netxml file
+
+        Returns
+        -------
+        Any
+            First truthy result of query, or None on timeout
+        """
+        last_mtime = None
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            mtime = self._mtime()
+            if mtime is not None and mtime != last_mtime:
+                last_mtime = mtime
+                result = query()
+                if result:
+                    return result
+            if not self.running:
+                self.logger.debug('Capture session is not running')
+                break
+            time.sleep(poll_interval)
+        return None
+
+
+    def _mtime(self) -> int | NoneType:
+        """Private function getting modification time of netxml file
+
+        Returns
+        -------
+        int | NoneType
+            Modification time in ns, or None if not yet written
+        """
+        try:
+            fstat = stat(self.netxml)
+        except (FileNotFoundError, TypeError):
+            return None
+        return fstat.st_mtime_ns if fstat.st_size else None
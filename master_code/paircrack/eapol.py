@@ -0,0 +1,292 @@
+from types import NoneType
+from os import stat
+import logging
+import mmap
+import struct
+
+
+class EapolScanner():
+    """Reads pcap files from airodump-ng to find EAPOL handshake frames
+
+    The cap file is memory-mapped and frames are inspected in place.
+    The byte offset of the last complete record is kept, so a cap file
+    that is still being written can be scanned again without reading
+    the frames that were already seen.
+
+    Messages are kept per AP and station together with their replay
+    counters, so only messages of the same handshake are paired.
+    """
+
+    # Link-layer types airodump-ng can write
+    LINKTYPE_IEEE802_11 = 105
+    LINKTYPE_RADIOTAP = 127
+
+    # Magic number of pcap files mapped to byte order
+    magics = {
+        b'\xd4\xc3\xb2\xa1': '<',
+        b'\xa1\xb2\xc3\xd4': '>',
+        b'\x4d\x3c\xb2\xa1': '<',   # nanosecond resolution
+        b'\xa1\xb2\x3c\x4d': '>',
+    }
+
+    llc_eapol = b'\xaa\xaa\x03\x00\x00\x00\x88\x8e'
+
+    # Key information flags of EAPOL-Key frames
+    KEY_INSTALL = 0x0040
+    KEY_ACK = 0x0080
+    KEY_MIC = 0x0100
+    KEY_SECURE = 0x0200
+    KEY_PAIRWISE = 0x0008
+
+    def __init__(self, capfile : str):
+        """Initializes scanner of given cap file without reading it
+
+        Parameters
+        ----------
+        capfile : str
+            Filepath to pcap file
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.capfile = capfile
+        self.offset = 0         # byte offset of next unread record
+        # (BSSID, station MAC) -> message number -> set of replay counters
+        self.messages = {}
+        self._byteorder = None
+        self._linktype = None
+
+
+    def scan(self) -> dict:
+        """Reads all complete records added since last scan
+
+        Returns
+        -------
+        dict
+            Tuple (BSSID, station MAC) mapped to dict of message number
+            (1-4) to set of replay counters seen so far
+        """
+        try:
+            size = stat(self.capfile).st_size
+        except FileNotFoundError:
+            self.logger.debug(f'File <{self.capfile}> not found')
+            return self.messages
+        if size <= self.offset or size < 24:
+            return self.messages
+
+        with open(self.capfile, 'rb') as capf:
+            with mmap.mmap(capf.fileno(), size, access=mmap.ACCESS_READ) as mm:
+                buf = memoryview(mm)
+                try:
+                    if self.offset == 0 and not self._read_header(buf):
+                        return self.messages
+                    self._read_records(buf, size)
+                finally:
+                    buf.release()
+        return self.messages
+
+
+    def handshake_messages(self, bssid : str, station=None) -> set:
+        """Gets handshake messages found for given AP
+
+        Parameters
+        ----------
+        bssid : str
+            BSSID of access point
+        station : str, optional
+            MAC of station. If None, messages of all stations are
+            included. By default None
+
+        Returns
+        -------
+        set
+            Set of message numbers (1-4) of the 4-way handshake
+        """
+        msgs = set()
+        for msgcounters in self._exchanges(bssid, station):
+            msgs.update(msgcounters)
+        return msgs
+
+
+    def has_handshake(self, bssid : str, station=None) -> bool:
+        """Checks if enough of the handshake is captured to crack the key
+
+        The second message is needed together with either the first
+        message of the same replay counter, or the third message of the
+        next replay counter, exchanged with the same station.
+
+        Parameters
+        ----------
+        bssid : str
+            BSSID of access point
+        station : str, optional
+            MAC of station. If None, any station. By default None
+
+        Returns
+        -------
+        bool
+            True if handshake is crackable. Otherwise False
+        """
+        for msgcounters in self._exchanges(bssid, station):
+            m1, m3 = msgcounters.get(1, set()), msgcounters.get(3, set())
+            for counter in msgcounters.get(2, ()):
+                if counter in m1 or counter + 1 in m3:
+                    return True
+        return False
+
+
+    def _exchanges(self, bssid : str, station : str | NoneType) -> list:
+        """Private function getting messages of AP after scanning
+
+        Parameters
+        ----------
+        bssid : str
+            BSSID of access point
+        station : str | NoneType
+            MAC of station, or None for all stations
+
+        Returns
+        -------
+        list
+            List of dicts of message number to set of replay counters,
+            one per station
+        """
+        bssid = bssid.upper()
+        station = None if station is None else station.upper()
+        return [msgcounters for (ap, sta), msgcounters in self.scan().items()
+                if ap == bssid and (station is None or sta == station)]
+
+
+    def _read_header(self, buf : memoryview) -> bool:
+        """Private function parsing the pcap global header
+
+        Parameters
+        ----------
+        buf : memoryview
+            Memory-mapped content of cap file
+
+        Returns
+        -------
+        bool
+            True if header is valid. Otherwise False
+        """
+        self._byteorder = self.magics.get(bytes(buf[:4]))
+        if self._byteorder is None:
+            self.logger.debug(f'File <{self.capfile}> is not a pcap file')
+            return False
+
+        self._linktype = struct.unpack_from(f'{self._byteorder}I', buf, 20)[0]
+        if self._linktype not in (self.LINKTYPE_IEEE802_11, self.LINKTYPE_RADIOTAP):
+            self.logger.debug(f'Unsupported link type: {self._linktype}')
+            return False
+
+        self.offset = 24
+        return True
+
+
+    def _read_records(self, buf : memoryview, size : int):
+        """Private function walking records from self.offset
+
+        Stops at a record that is not yet completely written.
+
+        Parameters
+        ----------
+        buf : memoryview
+            Memory-mapped content of cap file
+        size : int
+            Size of cap file in bytes
+        """
+        if self._byteorder is None:
+            return
+        rechdr = f'{self._byteorder}8xII'
+        offset = self.offset
+        while offset + 16 <= size:
+            caplen, _ = struct.unpack_from(rechdr, buf, offset)
+            end = offset + 16 + caplen
+            if end > size:
+                break
+            self._read_frame(buf[offset + 16:end])
+            offset = end
+        self.offset = offset
+
+
+    def _read_frame(self, frame : memoryview):
+        """Private function storing the handshake message of a frame
+
+        Parameters
+        ----------
+        frame : memoryview
+            Captured frame, including radiotap header if present
+        """
+        if self._linktype == self.LINKTYPE_RADIOTAP:
+            if len(frame) < 4:
+                return
+            frame = frame[struct.unpack_from('<H', frame, 2)[0]:]
+
+        if len(frame) < 24:
+            return
+        fc0, fc1 = frame[0], frame[1]
+        if (fc0 >> 2) & 0x3 != 2 or fc1 & 0x40:
+            return      # not data, or protected
+
+        tods, fromds = fc1 & 0x1, fc1 & 0x2
+        if tods and fromds:
+            return      # WDS frames are not part of handshakes
+        elif tods:
+            bssid, station = frame[4:10], frame[10:16]
+        elif fromds:
+            bssid, station = frame[10:16], frame[4:10]
+        else:
+            bssid = frame[16:22]
+            station = frame[4:10] if frame[10:16] == bssid else frame[10:16]
+
+        hdrlen = 24
+        if (fc0 >> 4) & 0x8:
+            hdrlen += 2         # QoS control
+            if fc1 & 0x80:
+                hdrlen += 4     # HT control
+        key = self._key_message(frame[hdrlen:])
+        if key is not None:
+            msg, counter = key
+            exchange = (_mac(bssid), _mac(station))
+            msgcounters = self.messages.setdefault(exchange, {})
+            msgcounters.setdefault(msg, set()).add(counter)
+
+
+    def _key_message(self, payload : memoryview) -> tuple | NoneType:
+        """Private function identifying message of EAPOL-Key payload
+
+        Parameters
+        ----------
+        payload : memoryview
+            Frame body following the 802.11 header
+
+        Returns
+        -------
+        tuple | NoneType
+            Tuple (message number 1-4 of the 4-way handshake, replay
+            counter), or None if payload is not a pairwise EAPOL-Key
+            frame
+        """
+        # LLC/SNAP (8), EAPOL header (4), descriptor type (1),
+        # key info (2), key length (2), replay counter (8)
+        if len(payload) < 25 or payload[:8] != self.llc_eapol or payload[9] != 3:
+            return None
+
+        keyinfo = struct.unpack_from('>H', payload, 13)[0]
+        if not keyinfo & self.KEY_PAIRWISE:
+            return None     # group key handshake
+        counter = struct.unpack_from('>Q', payload, 17)[0]
+
+        ack = keyinfo & self.KEY_ACK
+        mic = keyinfo & self.KEY_MIC
+        if ack and not mic:
+            return 1, counter
+        elif ack and mic and keyinfo & self.KEY_INSTALL:
+            return 3, counter
+        elif mic and not ack:
+            return (4 if keyinfo & self.KEY_SECURE else 2), counter
+        return None
+
+
+def _mac(addr : memoryview) -> str:
+    """Formats address bytes as upper-case MAC"""
+    return ':'.join(f'{b:02X}' for b in addr)
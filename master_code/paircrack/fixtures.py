@@ -0,0 +1,123 @@
+"""
+Generates synthetic airodump-ng output files for benchmarks and tests
+"""
+
+import struct
+import time
+
+
+NETXML_TIME = '%a %b %d %H:%M:%S %Y'
+
+
+def bssid(i : int, prefix='02:00') -> str:
+    """Returns a locally administered MAC address numbered by i"""
+    return f'{prefix}:' + ':'.join(f'{b:02X}' for b in i.to_bytes(4, 'big'))
+
+
+def write_netxml(filepath : str, networks : list):
+    """Writes a kismet netxml file like airodump-ng does
+
+    Parameters
+    ----------
+    filepath : str
+        Filepath of netxml file
+    networks : list
+        list of tuples (BSSID, ESSID, Channel, signal, clients) where
+        clients is a list of client MACs
+    """
+    now = time.strftime(NETXML_TIME)
+    lines = ['<?xml version="1.0" encoding="ISO-8859-1"?>',
+             '<detection-run kismet-version="airodump-ng-1.0">']
+    for num, (bssid_, essid, channel, signal, clients) in enumerate(networks, 1):
+        lines.append(f'<wireless-network number="{num}" type="infrastructure" '
+                     f'first-time="{now}" last-time="{now}">')
+        lines.append(f'<SSID><type>Beacon</type><max-rate>54.000000</max-rate>'
+                     f'<packets>10</packets><encryption>WPA+PSK</encryption>'
+                     f'<encryption>WPA+AES-CCM</encryption>'
+                     f'<essid cloaked="false">{essid}</essid></SSID>')
+        lines.append(f'<BSSID>{bssid_}</BSSID><manuf>Unknown</manuf>'
+                     f'<channel>{channel}</channel><freqmhz>2437 10</freqmhz>')
+        lines.append(f'<snr-info><last_signal_dbm>{signal}</last_signal_dbm>'
+                     f'<min_signal_dbm>{signal}</min_signal_dbm></snr-info>')
+        for cnum, mac in enumerate(clients, 1):
+            lines.append(f'<wireless-client number="{cnum}" type="established" '
+                         f'first-time="{now}" last-time="{now}">'
+                         f'<client-mac>{mac}</client-mac>'
+                         f'<snr-info><last_signal_dbm>{signal - 10}</last_signal_dbm></snr-info>'
+                         f'</wireless-client>')
+        lines.append('</wireless-network>')
+    lines.append('</detection-run>')
+    with open(filepath, 'w') as xmlfile:
+        xmlfile.write('\n'.join(lines))
+
+
+def random_networks(count : int, clients_per_ap=2, target=None) -> list:
+    """Returns count networks for write_netxml, target appended last
+
+    Parameters
+    ----------
+    count : int
+        Number of networks
+    clients_per_ap : int, optional
+        Number of clients of each network, by default 2
+    target : tuple, optional
+        (BSSID, ESSID, Channel) of a network added at the end, by
+        default None
+
+    Returns
+    -------
+    list
+        list of network tuples
+    """
+    networks = []
+    for i in range(count):
+        clients = [bssid(i * clients_per_ap + c, '06:00') for c in range(clients_per_ap)]
+        networks.append((bssid(i), f'NET-{i:05}', str(1 + i % 13), -30 - i % 60, clients))
+    if target is not None:
+        networks.append((*target, -40, [bssid(0, '0A:00')]))
+    return networks
+
+
+def eapol_frame(ap : bytes, sta : bytes, keyinfo : int, from_ap : bool, counter=1) -> bytes:
+    """Returns an 802.11 QoS data frame carrying an EAPOL-Key message"""
+    fc = bytes([0x88, 0x02 if from_ap else 0x01])
+    addrs = sta + ap + ap if from_ap else ap + sta + ap
+    body = (b'\xaa\xaa\x03\x00\x00\x00\x88\x8e' + bytes([2, 3, 0, 95, 2])
+            + struct.pack('>HHQ', keyinfo, 16, counter) + bytes(83))
+    return fc + b'\x00\x00' + addrs + b'\x00\x00' + b'\x00\x00' + body
+
+
+def data_frame(ap : bytes, sta : bytes, size=200) -> bytes:
+    """Returns a protected 802.11 data frame"""
+    return bytes([0x08, 0x42, 0, 0]) + sta + ap + ap + b'\x00\x00' + bytes(size)
+
+
+def write_pcap(filepath : str, frames : list, append=False):
+    """Writes frames to a pcap file with 802.11 link type
+
+    Parameters
+    ----------
+    filepath : str
+        Filepath of cap file
+    frames : list
+        list of bytes of frames
+    append : bool, optional
+        Add records to existing file instead of creating it, by default False
+    """
+    with open(filepath, 'ab' if append else 'wb') as capfile:
+        if not append:
+            capfile.write(struct.pack('<IHHiIII', 0xa1b2c3d4, 2, 4, 0, 0, 65535, 105))
+        for frame in frames:
+            capfile.write(struct.pack('<IIII', 0, 0, len(frame), len(frame)) + frame)
+
+
+def handshake_frames(ap : bytes, sta : bytes, counter=1) -> list:
+    """Returns the four messages of a WPA2 4-way handshake
+
+    Messages 1 and 2 use counter as replay counter, messages 3 and 4
+    the next one, like an AP does.
+    """
+    return [eapol_frame(ap, sta, 0x008a, True, counter),
+            eapol_frame(ap, sta, 0x010a, False, counter),
+            eapol_frame(ap, sta, 0x13ca, True, counter + 1),
+            eapol_frame(ap, sta, 0x030a, False, counter + 1)]
@@ -1,6 +1,5 @@
 import sys
 import subprocess
-from os import getcwd
 from threading import Thread, Lock
 import time
 
@@ -12,19 +11,24 @@ class Hostetd(ToolExecutor):
     
     toolcomm = 'hostapd'
 
-    def __init__(self, loglevel : int):
-        """Initializes output attributes and sets filepath
+    def __init__(self, loglevel : int, artifacts=None):
+        """Initializes output attributes
+
+        The configuration filepath is set by create_conf, so nothing is
+        written before it is needed.
 
         Parameters
         ----------
         loglevel : int
             Level of logger verbosity
+        artifacts : ArtifactManager, optional
+            Manager of output files, by default None
         """        
-        super().__init__(loglevel)
+        super().__init__(loglevel, artifacts)
         self.lock = Lock()
         self.output = []    # buffer for all unread output
         self.out_log = []   # all output from object init
-        self.filepath = f'{getcwd()}/hostapd.conf'
+        self.filepath = None    # set by create_conf
         
     
     def __enter__(self):
@@ -123,7 +127,9 @@ class Hostetd(ToolExecutor):
         confstr = ''
         for key, val in confdict.items():
             confstr += f'{key}={val}\n'
-        
+
+        if self.filepath is None:
+            self.filepath = self.artifacts.path('hostapd.conf')
         with open(self.filepath, 'w') as conffile:
             conffile.write(confstr)
         
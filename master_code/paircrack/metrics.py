@@ -0,0 +1,185 @@
+from contextlib import contextmanager
+from os import getpid
+import json
+import logging
+import threading
+import time
+
+
+class Span():
+    """Timed section of a run, e.g. an attack phase or a tool call"""
+
+    __slots__ = ('name', 'start', 'duration', 'parent', 'attrs')
+
+    def __init__(self, name : str, start : float, parent=None, **attrs):
+        """Starts the span
+
+        Parameters
+        ----------
+        name : str
+            Name of the span, e.g. 'phase.capture_ap' or 'tool.run'
+        start : float
+            Start time in epoch seconds
+        parent : str, optional
+            Name of enclosing span, by default None
+        **attrs
+            Extra attributes exported with the span
+        """
+        self.name = name
+        self.start = start
+        self.duration = None
+        self.parent = parent
+        self.attrs = attrs
+
+    def as_dict(self) -> dict:
+        """Gets span as dict for JSON export
+
+        Returns
+        -------
+        dict
+            name, parent, start, duration_s and all attributes
+        """
+        return {
+            'name': self.name,
+            'parent': self.parent,
+            'start': round(self.start, 6),
+            'duration_s': None if self.duration is None else round(self.duration, 6),
+            **self.attrs}
+
+
+class Tracer():
+    """Collects spans of a run and exports them as JSON lines
+
+    Spans opened with the span context manager nest, and record the
+    innermost open span of the same thread as parent.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.run_id = f'{time.strftime("%Y%m%d-%H%M%S")}-{getpid()}'
+        self.spans = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+
+    @contextmanager
+    def span(self, name : str, **attrs):
+        """Times the enclosed block
+
+        Parameters
+        ----------
+        name : str
+            Name of the span
+        **attrs
+            Extra attributes. More can be added to span.attrs inside
+            the block
+
+        Yields
+        ------
+        Span
+            The open span
+        """
+        stack = self._stack()
+        span = Span(name, time.time(), stack[-1].name if stack else None, **attrs)
+        stack.append(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.attrs['error'] = type(e).__name__
+            raise
+        finally:
+            span.duration = time.perf_counter() - start
+            stack.pop()
+            self._add(span)
+
+
+    def record(self, name : str, start : float, duration : float, **attrs) -> Span:
+        """Adds an already timed span
+
+        Used where blocks interleave on one thread, e.g. coroutines.
+
+        Parameters
+        ----------
+        name : str
+            Name of the span
+        start : float
+            Start time in epoch seconds
+        duration : float
+            Duration in seconds
+        **attrs
+            Extra attributes
+
+        Returns
+        -------
+        Span
+            The recorded span
+        """
+        stack = self._stack()
+        span = Span(name, start, stack[-1].name if stack else None, **attrs)
+        span.duration = duration
+        self._add(span)
+        return span
+
+
+    def summary(self) -> dict:
+        """Aggregates spans by name
+
+        Returns
+        -------
+        dict
+            name mapped to dict of count, total_s and max_s
+        """
+        summary = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            stats = summary.setdefault(span.name, {'count': 0, 'total_s': 0.0, 'max_s': 0.0})
+            stats['count'] += 1
+            stats['total_s'] += span.duration
+            stats['max_s'] = max(stats['max_s'], span.duration)
+        return summary
+
+
+    def export(self, filepath : str) -> int:
+        """Appends spans finished since last export to filepath as JSON lines
+
+        Exported spans are removed from self.spans, so exporting again,
+        e.g. from another run in the same process using the shared
+        tracer, does not write them twice. Every line holds the run_id,
+        so files can collect many runs.
+
+        Parameters
+        ----------
+        filepath : str
+            Filepath of JSON lines file
+
+        Returns
+        -------
+        int
+            Number of spans written
+        """
+        with self._lock:
+            spans, self.spans = self.spans, []
+        with open(filepath, 'a') as jsonlfile:
+            for span in spans:
+                jsonlfile.write(json.dumps({'run': self.run_id, **span.as_dict()}) + '\n')
+        self.logger.debug(f'Exported {len(spans)} spans to <{filepath}>')
+        return len(spans)
+
+
+    def _add(self, span : Span):
+        """Private function storing a finished span"""
+        with self._lock:
+            self.spans.append(span)
+
+
+    def _stack(self) -> list:
+        """Private function getting open spans of current thread"""
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+
+# Tracer shared by all tools unless replaced
+tracer = Tracer()
@@ -0,0 +1,343 @@
+from os import listdir, makedirs, path, rename
+import asyncio
+import logging
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+from .airmon import Airmon
+from .toolexecutor import ToolExecutor, ToolResult
+
+
+class ReplayProcess():
+    """Stand-in for subprocess.Popen of a replayed long-running tool
+
+    Runs a list of timed steps in a thread, e.g. writing netxml
+    snapshots, and keeps running after the last step until terminated
+    like airodump-ng does.
+    """
+
+    def __init__(self, command : list, steps : list):
+        """Starts running the steps
+
+        Parameters
+        ----------
+        command : list
+            list of strings of the replayed command
+        steps : list
+            list of tuples (seconds after start, function without
+            arguments), sorted by time
+        """
+        self.args = command
+        self.pid = None
+        self.returncode = None
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run_steps, args=(steps,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run_steps(self, steps : list):
+        start = time.monotonic()
+        for at, step in steps:
+            if self._stopped.wait(max(0, start + at - time.monotonic())):
+                return
+            step()
+
+    def poll(self) -> int:
+        return self.returncode
+
+    def wait(self, timeout=None) -> int:
+        if not self._stopped.wait(timeout):
+            raise subprocess.TimeoutExpired(self.args, timeout)
+        return self.returncode
+
+    def terminate(self):
+        if self.returncode is None:
+            self.returncode = -15
+        self._stopped.set()
+        self._thread.join()
+
+    kill = terminate
+
+
+class ReplayBackend():
+    """Replays recorded tool output instead of running the tools
+
+    When installed, ToolExecutor.run, spawn and run_async are served by
+    this object, and Airmon reads a fake sysfs tree. No wireless
+    hardware or root is needed.
+
+    Fixtures can be added in code or loaded from a directory:
+
+        <fixtures_dir>/<tool>.stdout      stdout returned by run
+        <fixtures_dir>/<tool>.stderr      stderr returned by run
+        <fixtures_dir>/airodump-ng/*.netxml   netxml snapshots, in name order
+        <fixtures_dir>/airodump-ng/*.cap      cap file of the capture
+
+    Run as context manager to install and uninstall it.
+    """
+
+    def __init__(self, fixtures_dir=None, interfaces=('wlan0', 'wlan1'), speed=1.0, write_interval=1.0):
+        """Creates the fake sysfs and loads fixtures
+
+        Parameters
+        ----------
+        fixtures_dir : str, optional
+            Directory of recorded fixtures, by default None
+        interfaces : tuple, optional
+            Names of fake wireless interfaces, by default ('wlan0', 'wlan1')
+        speed : float, optional
+            Replay speed. All delays are divided by it, by default 1.0
+        write_interval : float, optional
+            Seconds between netxml snapshots loaded from fixtures_dir,
+            by default 1.0
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.speed = speed
+        self.responses = {}     # tool or (tool, subcommand) -> response dict
+        self.captures = []      # capture scripts, consumed per airodump-ng spawn
+        self.calls = []         # every replayed command
+
+        self._tmpdir = tempfile.TemporaryDirectory(prefix='paircrack-replay-')
+        self.sysfs_root = path.join(self._tmpdir.name, 'net')
+        for phy, iface in enumerate(interfaces):
+            self._add_interface(iface, f'phy{phy}', monitor=False)
+
+        self._saved = None
+        if fixtures_dir is not None:
+            self._load_fixtures(fixtures_dir, write_interval)
+
+
+    def __enter__(self):
+        self.install()
+        return self
+
+    def __exit__(self, *exc_args):
+        self.uninstall()
+
+
+    def install(self):
+        """Makes all tools use this backend"""
+        self._saved = (ToolExecutor.backend, Airmon.sysfs_root)
+        ToolExecutor.backend = self
+        Airmon.sysfs_root = self.sysfs_root
+
+    def uninstall(self):
+        """Restores the real tools and removes the fake sysfs
+
+        The backend cannot be installed again afterwards.
+        """
+        if self._saved is not None:
+            ToolExecutor.backend, Airmon.sysfs_root = self._saved
+            self._saved = None
+        self._tmpdir.cleanup()
+
+
+    def respond(self, tool : str, stdout='', stderr='', returncode=0, delay=0.0, subcommand=None):
+        """Sets output returned when tool is run
+
+        Parameters
+        ----------
+        tool : str
+            Name of tool, e.g. 'aircrack-ng'
+        stdout : str, optional
+            Replayed stdout, by default ''
+        stderr : str, optional
+            Replayed stderr, by default ''
+        returncode : int, optional
+            Replayed exit status, by default 0
+        delay : float, optional
+            Seconds the tool appears to run, by default 0.0
+        subcommand : str, optional
+            Only respond when first argument equals subcommand, e.g.
+            'start' for airmon-ng. By default None
+        """
+        key = tool if subcommand is None else (tool, subcommand)
+        self.responses[key] = {
+            'stdout': stdout,
+            'stderr': stderr,
+            'returncode': returncode,
+            'delay': delay}
+
+
+    def add_capture(self, snapshots : list, capfile=None, cap_delay=0.0):
+        """Adds a capture replayed by the next airodump-ng spawn
+
+        The last capture added is reused if more processes are spawned
+        than captures added.
+
+        Parameters
+        ----------
+        snapshots : list
+            list of tuples (seconds after start, netxml filepath). Each
+            is copied to the output netxml file at that time
+        capfile : str, optional
+            Filepath of cap file copied to the output, by default None
+        cap_delay : float, optional
+            Seconds after start the cap file is written, by default 0.0
+        """
+        self.captures.append((sorted(snapshots), capfile, cap_delay))
+
+
+    def run(self, command : list, timeout=None) -> subprocess.CompletedProcess:
+        """Replays a blocking tool run
+
+        Parameters
+        ----------
+        command : list
+            list of strings of commands
+        timeout : int, optional
+            seconds before the run times out, by default None
+
+        Returns
+        -------
+        subprocess.CompletedProcess
+            replayed output
+
+        Raises
+        ------
+        subprocess.TimeoutExpired
+            if the replayed delay is longer than timeout
+        """
+        response = self._respond(command)
+        delay = response['delay'] / self.speed
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise subprocess.TimeoutExpired(command, timeout)
+        time.sleep(delay)
+        return subprocess.CompletedProcess(command, response['returncode'],
+                                           response['stdout'], response['stderr'])
+
+
+    async def run_async(self, command : list, timeout=None) -> ToolResult:
+        """Replays a tool run on the event loop
+
+        Parameters
+        ----------
+        command : list
+            list of strings of commands
+        timeout : int, optional
+            seconds before the run times out, by default None
+
+        Returns
+        -------
+        ToolResult
+            replayed output
+        """
+        response = self._respond(command)
+        delay = response['delay'] / self.speed
+        if timeout is not None and delay > timeout:
+            await asyncio.sleep(timeout)
+            return ToolResult(command, -15, '', '', True)
+        await asyncio.sleep(delay)
+        return ToolResult(command, response['returncode'],
+                          response['stdout'], response['stderr'], False)
+
+
+    def spawn(self, command : list) -> ReplayProcess:
+        """Replays a long-running tool
+
+        airodump-ng writes the next added capture to its --write
+        prefix. Other tools run until terminated without output.
+
+        Parameters
+        ----------
+        command : list
+            list of strings of commands
+
+        Returns
+        -------
+        ReplayProcess
+            handle behaving like subprocess.Popen
+        """
+        self.calls.append(command)
+        steps = []
+        if command[0] == 'airodump-ng' and self.captures and '--write' in command:
+            fprefix = command[command.index('--write') + 1]
+            snapshots, capfile, cap_delay = self.captures[0]
+            if len(self.captures) > 1:
+                self.captures.pop(0)
+
+            netxml = f'{fprefix}-01.kismet.netxml'
+            for at, snapshot in snapshots:
+                steps.append((at / self.speed, self._copier(snapshot, netxml)))
+            if capfile is not None:
+                steps.append((cap_delay / self.speed, self._copier(capfile, f'{fprefix}-01.cap')))
+            steps.sort(key=lambda step: step[0])
+        return ReplayProcess(command, steps)
+
+
+    def _respond(self, command : list) -> dict:
+        """Private function finding response and emulating side effects"""
+        self.calls.append(command)
+        tool = command[0]
+        subcommand = command[1] if len(command) > 1 else None
+
+        if tool == 'airmon-ng' and subcommand in ('start', 'stop') and len(command) > 2:
+            self._switch_mode(command[2], subcommand == 'start')
+
+        response = self.responses.get((tool, subcommand), self.responses.get(tool))
+        if response is None:
+            response = {'stdout': '', 'stderr': '', 'returncode': 0, 'delay': 0.0}
+        return response
+
+
+    def _switch_mode(self, interface : str, monitor : bool):
+        """Private function emulating airmon-ng start and stop in sysfs
+
+        Parameters
+        ----------
+        interface : str
+            Interface given to airmon-ng
+        monitor : bool
+            True for start, False for stop
+        """
+        ifpath = path.join(self.sysfs_root, interface)
+        if not path.isdir(ifpath):
+            return
+        newname = f'{interface}mon' if monitor else interface.removesuffix('mon')
+        with open(path.join(ifpath, 'type'), 'w') as typefile:
+            typefile.write('803\n' if monitor else '1\n')
+        rename(ifpath, path.join(self.sysfs_root, newname))
+
+
+    def _add_interface(self, interface : str, phy : str, monitor : bool):
+        """Private function adding a wireless interface to fake sysfs"""
+        ifpath = path.join(self.sysfs_root, interface)
+        makedirs(path.join(ifpath, 'phy80211'))
+        with open(path.join(ifpath, 'phy80211', 'name'), 'w') as phyfile:
+            phyfile.write(f'{phy}\n')
+        with open(path.join(ifpath, 'type'), 'w') as typefile:
+            typefile.write('803\n' if monitor else '1\n')
+
+
+    def _copier(self, src : str, dst : str):
+        """Private function creating a step that copies src to dst"""
+        def copy():
+            # Written next to dst and renamed, so readers never see a
+            # half-copied file. airodump-ng itself may still leave one.
+            shutil.copyfile(src, f'{dst}.replay')
+            rename(f'{dst}.replay', dst)
+        return copy
+
+
+    def _load_fixtures(self, fixtures_dir : str, write_interval : float):
+        """Private function loading fixtures from directory"""
+        for filename in listdir(fixtures_dir):
+            tool, _, stream = filename.rpartition('.')
+            if stream in ('stdout', 'stderr'):
+                with open(path.join(fixtures_dir, filename)) as streamfile:
+                    self.responses.setdefault(tool, {
+                        'stdout': '', 'stderr': '', 'returncode': 0, 'delay': 0.0
+                    })[stream] = streamfile.read()
+
+        dumpdir = path.join(fixtures_dir, 'airodump-ng')
+        if path.isdir(dumpdir):
+            filenames = sorted(listdir(dumpdir))
+            snapshots = [(i * write_interval, path.join(dumpdir, fn))
+                         for i, fn in enumerate(fn for fn in filenames if fn.endswith('.netxml'))]
+            capfiles = [path.join(dumpdir, fn) for fn in filenames if fn.endswith('.cap')]
+            self.add_capture(snapshots, capfiles[0] if capfiles else None)
+        self.logger.debug(f'Loaded fixtures from <{fixtures_dir}>')
@@ -0,0 +1,268 @@
+from types import NoneType
+from bisect import bisect_left, insort
+
+
+class AccessPoint():
+    """Access point seen in one or more captures"""
+
+    __slots__ = ('bssid', 'essid', 'channel', 'signal', 'first_seen', 'last_seen', 'clients')
+
+    def __init__(self, bssid : str, essid : str | NoneType, channel : str, signal : int | NoneType, first_seen : float, last_seen : float):
+        self.bssid = bssid
+        self.essid = essid
+        self.channel = channel
+        self.signal = signal            # last signal strength in dBm
+        self.first_seen = first_seen    # epoch seconds
+        self.last_seen = last_seen
+        self.clients = set()            # MACs of associated stations
+
+    def as_tuple(self) -> tuple:
+        """Gets AP in the format used by Airodump.parse_aps_netxml
+
+        Returns
+        -------
+        tuple
+            Tuple of AP data (BSSID, ESSID, Channel)
+        """
+        return (self.bssid, self.essid, self.channel)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.bssid}, {self.essid}, channel={self.channel})'
+
+
+class Station():
+    """Client station seen associated to an access point"""
+
+    __slots__ = ('mac', 'bssid', 'signal', 'first_seen', 'last_seen')
+
+    def __init__(self, mac : str, bssid : str, signal : int | NoneType, first_seen : float, last_seen : float):
+        self.mac = mac
+        self.bssid = bssid              # AP the station was last seen with
+        self.signal = signal
+        self.first_seen = first_seen
+        self.last_seen = last_seen
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.mac}, bssid={self.bssid})'
+
+
+class ScanDatabase():
+    """Accumulates APs and stations over all capture snapshots
+
+    APs are indexed by BSSID in a dict, and by upper-case ESSID in a
+    sorted list so ESSID prefixes can be looked up with bisection.
+    """
+
+    def __init__(self):
+        self.aps = {}           # BSSID -> AccessPoint
+        self.stations = {}      # MAC -> Station
+        self._essids = []       # sorted list of (ESSID upper-case, BSSID)
+
+
+    def __len__(self):
+        return len(self.aps)
+
+
+    def merge(self, networks) -> int:
+        """Merges a snapshot of networks into the database
+
+        Parameters
+        ----------
+        networks : iterable
+            Tuples (BSSID, ESSID, Channel, signal, first_seen,
+            last_seen, clients) as yielded by
+            Airodump.iter_networks_netxml, where clients is a list of
+            tuples (MAC, signal, first_seen, last_seen)
+
+        Returns
+        -------
+        int
+            Number of APs not seen before
+        """
+        new = 0
+        for bssid, essid, channel, signal, first_seen, last_seen, clients in networks:
+            ap = self.aps.get(bssid)
+            if ap is None:
+                ap = AccessPoint(bssid, essid, channel, signal, first_seen, last_seen)
+                self.aps[bssid] = ap
+                self._index_essid(ap)
+                new += 1
+            else:
+                if essid is not None and essid != ap.essid:
+                    self._unindex_essid(ap)
+                    ap.essid = essid
+                    self._index_essid(ap)
+                if last_seen >= ap.last_seen:
+                    ap.channel = channel
+                    ap.last_seen = last_seen
+                    if signal is not None:
+                        ap.signal = signal
+                ap.first_seen = min(ap.first_seen, first_seen)
+
+            for mac, csignal, cfirst, clast in clients:
+                self._merge_station(ap, mac, csignal, cfirst, clast)
+        return new
+
+
+    def get(self, bssid : str) -> AccessPoint | NoneType:
+        """Gets AP by BSSID
+
+        Parameters
+        ----------
+        bssid : str
+            BSSID of AP
+
+        Returns
+        -------
+        AccessPoint | NoneType
+            AP if seen, otherwise None
+        """
+        return self.aps.get(bssid.upper())
+
+
+    def find_prefix(self, prefix : str) -> list:
+        """Gets APs whose ESSID starts with prefix, ignoring case
+
+        Parameters
+        ----------
+        prefix : str
+            Start of ESSID
+
+        Returns
+        -------
+        list
+            List of AccessPoint sorted by ESSID
+        """
+        prefix = prefix.upper()
+        aps = []
+        i = bisect_left(self._essids, (prefix, ''))
+        while i < len(self._essids) and self._essids[i][0].startswith(prefix):
+            aps.append(self.aps[self._essids[i][1]])
+            i += 1
+        return aps
+
+
+    def find(self, query : str) -> AccessPoint | NoneType:
+        """Finds AP matching query
+
+        Tries an exact BSSID, then an exact ESSID, then an ESSID prefix,
+        and finally any AP with query as part of its BSSID or ESSID.
+        Hidden networks are not matched.
+
+        Parameters
+        ----------
+        query : str
+            ESSID or BSSID, or part of it, of the AP to search for
+
+        Returns
+        -------
+        AccessPoint | NoneType
+            Best matching AP as ranked by match_key, or None if not
+            found
+        """
+        ap = self.get(query)
+        if ap is not None and ap.essid is not None:
+            return ap
+
+        matches = self.find_prefix(query)
+        if not matches:
+            matches = [ap for ap in self.aps.values()
+                       if match_key(query, ap.bssid, ap.essid, ap.signal) is not None]
+        if not matches:
+            return None
+        return min(matches, key=lambda ap: match_key(query, ap.bssid, ap.essid, ap.signal))
+
+
+    def clients(self, bssid : str) -> list:
+        """Gets MACs of stations seen associated to AP
+
+        Parameters
+        ----------
+        bssid : str
+            BSSID of AP
+
+        Returns
+        -------
+        list
+            List of client MACs, most recently seen first
+        """
+        ap = self.get(bssid)
+        if ap is None:
+            return []
+        stations = [self.stations[mac] for mac in ap.clients]
+        stations.sort(key=lambda sta: sta.last_seen, reverse=True)
+        return [sta.mac for sta in stations]
+
+
+    def _merge_station(self, ap : AccessPoint, mac : str, signal : int | NoneType, first_seen : float, last_seen : float):
+        """Private function merging a client of ap into the database"""
+        sta = self.stations.get(mac)
+        if sta is None:
+            self.stations[mac] = Station(mac, ap.bssid, signal, first_seen, last_seen)
+        else:
+            if last_seen >= sta.last_seen:
+                if sta.bssid != ap.bssid and sta.bssid in self.aps:
+                    self.aps[sta.bssid].clients.discard(mac)
+                sta.bssid = ap.bssid
+                sta.last_seen = last_seen
+                if signal is not None:
+                    sta.signal = signal
+            sta.first_seen = min(sta.first_seen, first_seen)
+        if self.stations[mac].bssid == ap.bssid:
+            ap.clients.add(mac)
+
+
+    def _index_essid(self, ap : AccessPoint):
+        """Private function adding ESSID of ap to prefix index"""
+        if ap.essid is not None:
+            insort(self._essids, (ap.essid.upper(), ap.bssid))
+
+    def _unindex_essid(self, ap : AccessPoint):
+        """Private function removing ESSID of ap from prefix index"""
+        if ap.essid is None:
+            return
+        key = (ap.essid.upper(), ap.bssid)
+        i = bisect_left(self._essids, key)
+        if i < len(self._essids) and self._essids[i] == key:
+            del self._essids[i]
+
+
+def match_key(query : str, bssid : str, essid : str | NoneType, signal : int | NoneType) -> tuple | NoneType:
+    """Ranks an AP as match of query, lower is better
+
+    Exact BSSID ranks first, then exact ESSID, ESSID prefix, and query
+    as part of BSSID or ESSID, all ignoring case. Ties go to the
+    strongest signal, then the lowest BSSID. Hidden networks do not
+    match. Shared by ScanDatabase.find and Airodump.find_ap_netxml so
+    both pick the same AP.
+
+    Parameters
+    ----------
+    query : str
+        ESSID or BSSID, or part of it, of the AP to search for
+    bssid : str
+        BSSID of AP
+    essid : str | NoneType
+        ESSID of AP, None if hidden
+    signal : int | NoneType
+        Last signal in dBm, None if unknown
+
+    Returns
+    -------
+    tuple | NoneType
+        Sort key of the match, or None if the AP does not match
+    """
+    if essid is None:
+        return None
+    query, bssid, essid = query.upper(), bssid.upper(), essid.upper()
+    if bssid == query:
+        rank = 0
+    elif essid == query:
+        rank = 1
+    elif essid.startswith(query):
+        rank = 2
+    elif query in bssid or query in essid:
+        rank = 3
+    else:
+        return None
+    return (rank, -1000 if signal is None else -signal, bssid)
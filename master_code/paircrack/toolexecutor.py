@@ -1,15 +1,68 @@
+import asyncio
 import logging
+import signal
 import subprocess
+import time
 from abc import ABC
-from os import stat, path
+from collections import deque
+from os import stat, path, killpg
+
+from .artifacts import ArtifactManager
+from .metrics import tracer
+
+
+class ToolResult():
+    """Output of a command run with ToolExecutor.run_async
+
+    Unlike subprocess.CompletedProcess, it is also returned when the
+    process times out, and then holds the output written before the
+    process was terminated.
+    """
+
+    def __init__(self, command : list, returncode : int, stdout : str, stderr : str, timed_out : bool):
+        """Stores the process output
+
+        Parameters
+        ----------
+        command : list
+            list of strings of the command that was run
+        returncode : int
+            exit status of the process. Negative if killed by signal,
+            None if the process could not be started
+        stdout : str
+            captured stdout, limited to the most recent lines
+        stderr : str
+            captured stderr, limited to the most recent lines
+        timed_out : bool
+            True if the process was terminated because of timeout
+        """
+        self.command = command
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.timed_out = timed_out
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(command={self.command}, '
+                f'returncode={self.returncode}, timed_out={self.timed_out})')
+
 
 class ToolExecutor(ABC):
     
-    logging.basicConfig(level=logging.DEBUG)
     folderpath = '/home/kali/master/code/airodumps'
+
+    # Object serving run, spawn and run_async instead of real processes,
+    # e.g. a ReplayBackend. None runs the real tools.
+    backend = None
+
+    # Every run, spawn and run_async is recorded as a span here
+    tracer = tracer
+
+    # Longest line in bytes kept by run_async, longer lines are cut
+    line_limit = 65536
     
     
-    def __init__(self, loglevel : int):
+    def __init__(self, loglevel : int, artifacts=None):
         """Creates a logging.logger with verbosity based on loglevel
 
         Loglevel 0 -> Logger in logging.INFO
@@ -21,9 +74,14 @@ class ToolExecutor(ABC):
         ----------
         loglevel : int
             verbosity level from 0 to 2
+        artifacts : ArtifactManager, optional
+            manager of output files, shared between tools of one run.
+            If None, one is created in folderpath when first needed.
+            By default None
         """        
         
         self.logger = logging.getLogger(self.__class__.__name__)
+        self._artifacts = artifacts
         
         self.verbose = False
         if loglevel == 0:
@@ -33,7 +91,14 @@ class ToolExecutor(ABC):
         if loglevel >= 2:
             self.verbose = True
 
-        
+
+
+    @property
+    def artifacts(self) -> ArtifactManager:
+        if self._artifacts is None:
+            self._artifacts = ArtifactManager(self.folderpath)
+        return self._artifacts
+
     
     def run(self, command : list, timeout=None, proc_flags={}) -> subprocess.CompletedProcess:
         """Runs the command using subprocesses
@@ -72,17 +137,331 @@ class ToolExecutor(ABC):
         if self.verbose:
             self.logger.debug(f'\tkeywords: <{proc_flags}>')
         
-        try: 
-            output = subprocess.run(command, **proc_flags)
-        except subprocess.TimeoutExpired as e:
-            self.logger.debug(f'Process timout')
-            return True
+        with self.tracer.span('tool.run', tool=command[0], argv=command) as span:
+            try: 
+                if self.backend is not None:
+                    output = self.backend.run(command, timeout)
+                else:
+                    output = self._run_process(command, proc_flags, span)
+            except subprocess.TimeoutExpired as e:
+                self.logger.debug(f'Process timout')
+                span.attrs['timed_out'] = True
+                return True
+            else:
+                span.attrs.update(
+                    exit_status=output.returncode,
+                    stdout_bytes=_nbytes(output.stdout),
+                    stderr_bytes=_nbytes(output.stderr))
+                if self.verbose:
+                    self.logger.debug(f'Captured stdout: <{output.stdout[:-1]}>')
+                    self.logger.debug(f'Captured stderr: <{output.stderr}>')
+                return output
+
+
+    def _run_process(self, command : list, proc_flags : dict, span) -> subprocess.CompletedProcess:
+        """Private function doing what subprocess.run does, timing the spawn
+
+        Parameters
+        ----------
+        command : list
+            list of strings of commands
+        proc_flags : dict
+            flags as given to subprocess.run
+        span : Span
+            span the spawn latency is added to
+
+        Returns
+        -------
+        subprocess.CompletedProcess
+            object returned when running the process
+
+        Raises
+        ------
+        subprocess.TimeoutExpired
+            if the process is killed because of timeout
+        """
+        proc_flags = dict(proc_flags)
+        timeout = proc_flags.pop('timeout', None)
+        if proc_flags.pop('capture_output', False):
+            proc_flags['stdout'] = proc_flags['stderr'] = subprocess.PIPE
+
+        start = time.perf_counter()
+        with subprocess.Popen(command, **proc_flags) as proc:
+            span.attrs['spawn_s'] = time.perf_counter() - start
+            try:
+                stdout, stderr = proc.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.communicate()
+                raise
+            except BaseException:
+                # e.g. KeyboardInterrupt, the child must not outlive the call
+                proc.kill()
+                raise
+        return subprocess.CompletedProcess(command, proc.returncode, stdout, stderr)
+
+
+    def spawn(self, command : list, proc_flags={}) -> subprocess.Popen:
+        """Starts the command without waiting for it to finish
+
+        Parameters
+        ----------
+        command : list
+            list of strings of commands
+        proc_flags : dict, optional
+            extra flags to run with subprocess.Popen, by default {}
+
+        Returns
+        -------
+        subprocess.Popen
+            handle of the running process
+        """
+        proc_flags = {
+            'stdin': subprocess.PIPE,
+            'stdout': subprocess.DEVNULL,
+            'stderr': subprocess.DEVNULL,
+            **proc_flags
+        }
+        self.logger.debug(f'Spawning command: <{command}>')
+        if self.verbose:
+            self.logger.debug(f'\tkeywords: <{proc_flags}>')
+        start = time.perf_counter()
+        if self.backend is not None:
+            proc = self.backend.spawn(command)
         else:
+            proc = subprocess.Popen(command, **proc_flags)
+        spawn_s = time.perf_counter() - start
+        self.tracer.record('tool.spawn', time.time() - spawn_s, spawn_s,
+                           tool=command[0], argv=command, spawn_s=spawn_s)
+        return proc
+
+
+    def stop(self, proc : subprocess.Popen, grace=1) -> int:
+        """Terminates a process started with spawn
+
+        Parameters
+        ----------
+        proc : subprocess.Popen
+            process to terminate
+        grace : int, optional
+            seconds to wait before killing the process, by default 1
+
+        Returns
+        -------
+        int
+            return code of the process
+        """
+        if proc.poll() is None:
+            proc.terminate()
+            try:
+                proc.wait(grace)
+            except subprocess.TimeoutExpired:
+                self.logger.debug('Process did not terminate, killing')
+                proc.kill()
+                proc.wait()
+        return proc.returncode
+
+
+    async def run_async(self, command : list, timeout=None, max_lines=1000, grace=1) -> ToolResult:
+        """Runs the command on the asyncio event loop
+
+        stdout and stderr are read line by line while the process runs,
+        keeping only the last max_lines lines of each, each cut to
+        line_limit bytes. The process is started in its own process
+        group, so the whole group is terminated on timeout.
+
+        Parameters
+        ----------
+        command : list
+            list of strings of commands
+        timeout : int, optional
+            the process will be terminated after timeout seconds, by default None
+        max_lines : int, optional
+            maximum number of lines kept per stream, by default 1000
+        grace : int, optional
+            seconds to wait after SIGTERM before SIGKILL, by default 1
+
+        Returns
+        -------
+        ToolResult
+            object holding exit status and output, also on timeout
+        """
+        self.logger.debug(f'Running command: <{command}>')
+        started = time.time()
+        start = time.perf_counter()
+        if self.backend is not None:
+            result = await self.backend.run_async(command, timeout)
+            self._record_async(command, result, started, start, None)
+            return result
+
+        proc = await asyncio.create_subprocess_exec(
+            *command,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True)
+        spawn_s = time.perf_counter() - start
+
+        stdout = deque(maxlen=max_lines)
+        stderr = deque(maxlen=max_lines)
+        readers = asyncio.gather(
+            self._read_stream(proc.stdout, stdout, 'stdout'),
+            self._read_stream(proc.stderr, stderr, 'stderr'))
+
+        exited = asyncio.ensure_future(proc.wait())
+        timed_out = False
+        try:
+            # Output is complete once the pipes close, which children of
+            # the process can delay past its exit, so both are timed
+            await asyncio.wait([exited, readers], timeout=timeout)
+            if not (exited.done() and readers.done()):
+                # Children still holding the pipes are killed, but the
+                # process did not time out itself if it already exited
+                timed_out = proc.returncode is None
+                self.logger.debug(f'Process timout' if timed_out else
+                                  f'Process exited, killing children holding its output')
+                await self._kill_group(proc, grace)
+            await readers
+        except BaseException:
+            # Cancelled, e.g. by a failing sibling or KeyboardInterrupt.
+            # The process must not outlive its coroutine.
+            exited.cancel()
+            readers.cancel()
+            await self._kill_group(proc, grace)
+            try:
+                await readers
+            except asyncio.CancelledError:
+                pass
+            raise
+
+        result = ToolResult(command, proc.returncode, ''.join(stdout), ''.join(stderr), timed_out)
+        self._record_async(command, result, started, start, spawn_s)
+        return result
+
+
+    def _record_async(self, command : list, result : ToolResult, started : float, start : float, spawn_s : float):
+        """Private function recording span of a run_async call
+
+        Parameters
+        ----------
+        command : list
+            list of strings of commands
+        result : ToolResult
+            output of the run
+        started : float
+            start time in epoch seconds
+        start : float
+            start time from time.perf_counter
+        spawn_s : float
+            seconds spent starting the process, None if replayed
+        """
+        self.tracer.record('tool.run_async', started, time.perf_counter() - start,
+                           tool=command[0], argv=command, spawn_s=spawn_s,
+                           exit_status=result.returncode, timed_out=result.timed_out,
+                           stdout_bytes=_nbytes(result.stdout),
+                           stderr_bytes=_nbytes(result.stderr))
+
+
+    def run_many(self, commands : list, timeout=None, max_lines=1000) -> list:
+        """Runs independent commands concurrently on one event loop
+
+        Parameters
+        ----------
+        commands : list
+            list of commands, each a list of strings
+        timeout : int, optional
+            each process will be terminated after timeout seconds, by default None
+        max_lines : int, optional
+            maximum number of lines kept per stream, by default 1000
+
+        Returns
+        -------
+        list
+            list of ToolResult in the same order as commands. A command
+            that could not be started gives a ToolResult with returncode
+            None and the error as stderr, without stopping the others
+        """
+        async def gather():
+            return await asyncio.gather(
+                *(self.run_async(command, timeout, max_lines) for command in commands),
+                return_exceptions=True)
+
+        results = asyncio.run(gather())
+        for i, result in enumerate(results):
+            if isinstance(result, BaseException):
+                if not isinstance(result, Exception):
+                    raise result
+                self.logger.debug(f'Command <{commands[i]}> failed: {result}')
+                results[i] = ToolResult(commands[i], None, '', str(result), False)
+        return results
+
+
+    async def _read_stream(self, stream : asyncio.StreamReader, lines : deque, name : str):
+        """Private function reading stream line by line until EOF
+
+        Lines end at \n or \r, as progress lines are rewritten with \r.
+        The stream is read in chunks, so a line longer than line_limit
+        bytes is cut instead of failing the read.
+
+        Parameters
+        ----------
+        stream : asyncio.StreamReader
+            stdout or stderr of the process
+        lines : deque
+            bounded buffer the decoded lines are appended to
+        name : str
+            name of stream, used when logging
+        """
+        def append(line : bytes):
+            line = line.decode('utf-8', errors='replace')
+            lines.append(line)
             if self.verbose:
-                self.logger.debug(f'Captured stdout: <{output.stdout[:-1]}>')
-                self.logger.debug(f'Captured stderr: <{output.stderr}>')
-            return output
-    
+                self.logger.debug(f'Captured {name}: <{line.rstrip()}>')
+
+        pending = b''       # start of a line not yet ended
+        cut = False         # whether the rest of the current line is dropped
+        while chunk := await stream.read(self.line_limit):
+            parts = (pending + chunk).splitlines(keepends=True)
+            pending = b'' if parts[-1].endswith(b'\n') else parts.pop()
+            for part in parts:
+                if cut:
+                    cut = False
+                elif len(part) > self.line_limit:
+                    append(part[:self.line_limit] + b'\n')
+                else:
+                    append(part)
+            if len(pending) > self.line_limit:
+                if not cut:
+                    append(pending[:self.line_limit] + b'\n')
+                    cut = True
+                pending = b''
+        if pending and not cut:
+            append(pending[:self.line_limit])
+
+
+    async def _kill_group(self, proc : asyncio.subprocess.Process, grace : int):
+        """Private function terminating the process group of proc
+
+        Parameters
+        ----------
+        proc : asyncio.subprocess.Process
+            process started in its own session
+        grace : int
+            seconds to wait after SIGTERM before SIGKILL
+        """
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            try:
+                killpg(proc.pid, sig)
+            except ProcessLookupError:
+                break
+            try:
+                await asyncio.wait_for(proc.wait(), grace)
+            except asyncio.TimeoutError:
+                self.logger.debug(f'Process group did not exit on {sig.name}')
+            else:
+                break
+        await proc.wait()
+
 
     def compound_command(self, command : str, command_args : list) -> list:
         """Adds command str to front of list command_args
@@ -127,3 +506,11 @@ class ToolExecutor(ABC):
         else:
             return True
 
+
+def _nbytes(data) -> int:
+    """Gets size in bytes of captured stdout or stderr"""
+    if data is None:
+        return 0
+    if isinstance(data, str):
+        return len(data.encode('utf-8', errors='replace'))
+    return len(data)
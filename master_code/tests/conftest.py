@@ -0,0 +1,16 @@
+import sys
+from os import path
+
+import pytest
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import paircrack
+
+
+@pytest.fixture
+def replay():
+    """ReplayBackend installed for the duration of a test"""
+    with paircrack.ReplayBackend(speed=10) as backend:
+        yield backend
@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+from paircrack import Airmon, ReplayBackend
+
+
+def test_nested_entry_starts_monitor_mode_once(replay):
+    airmon = Airmon(0)
+    assert airmon.interface == 'wlan0'
+
+    with airmon as mon:
+        assert mon.interface == 'wlan0mon'
+        with airmon:
+            assert airmon.interface == 'wlan0mon'
+        assert airmon.interface == 'wlan0mon'
+        assert airmon.is_monitor('wlan0mon')
+    assert airmon.interface == 'wlan0'
+    assert not airmon.is_monitor('wlan0')
+
+    commands = [call[:2] for call in replay.calls if call[0] == 'airmon-ng']
+    assert commands == [['airmon-ng', 'check'], ['airmon-ng', 'start'], ['airmon-ng', 'stop']]
+
+
+def test_nested_exit_lets_exception_through(replay):
+    airmon = Airmon(0)
+    with airmon:
+        with pytest.raises(ValueError):
+            with airmon:
+                raise ValueError
+        assert airmon.interface == 'wlan0mon'
+    assert airmon.interface == 'wlan0'
+
+
+def test_channel_change_in_session_uses_iw(replay):
+    airmon = Airmon(0)
+    airmon.channel = 6
+    with airmon:
+        airmon.channel = 11
+    assert ['iw', 'dev', 'wlan0mon', 'set', 'channel', '11'] in replay.calls
+    assert not any(call[0] == 'iw' and call[-1] == '6' for call in replay.calls)
+
+
+def test_interface_already_in_monitor_mode_is_kept(replay):
+    replay._switch_mode('wlan0', True)
+    airmon = Airmon(0)
+    with airmon:
+        assert airmon.interface == 'wlan0mon'
+    assert airmon.interface == 'wlan0mon'
+    assert not any(call[0] == 'airmon-ng' for call in replay.calls)
+
+
+def test_failed_entry_is_not_counted(replay, monkeypatch):
+    airmon = Airmon(0)
+
+    def missing(command, *args, **kwargs):
+        raise FileNotFoundError(command[0])
+    monkeypatch.setattr(airmon, 'run', missing)
+    with pytest.raises(FileNotFoundError):
+        with airmon:
+            pass
+    monkeypatch.undo()
+
+    with airmon:
+        assert airmon.interface == 'wlan0mon'
+    assert airmon.interface == 'wlan0'
+
+
+def test_replay_removes_fake_sysfs():
+    with ReplayBackend() as replay:
+        sysfs = replay.sysfs_root
+        assert Airmon.sysfs_root == sysfs and os.path.isdir(sysfs)
+    assert Airmon.sysfs_root != sysfs and not os.path.exists(sysfs)
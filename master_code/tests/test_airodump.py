@@ -0,0 +1,75 @@
+from paircrack import fixtures
+from paircrack import Airodump, ArtifactManager, ScanDatabase
+
+
+TARGET = ('0E:00:00:00:00:01', 'TARGET-AP', '6')
+
+
+def netxml(tmp_path, name, networks):
+    filepath = str(tmp_path / f'{name}.kismet.netxml')
+    fixtures.write_netxml(filepath, networks)
+    return filepath
+
+
+def test_parse_netxml(tmp_path):
+    filepath = netxml(tmp_path, 'aps', fixtures.random_networks(20, target=TARGET))
+    airodump = Airodump(0, ArtifactManager(str(tmp_path / 'out')))
+
+    aps = airodump.parse_aps_netxml(filepath)
+    assert len(aps) == 21 and aps[-1] == TARGET
+    assert airodump.parse_clients_netxml(filepath, TARGET[0]) == ['0A:00:00:00:00:00']
+    assert airodump.find_ap_netxml(filepath, 'target-ap') == TARGET
+    assert airodump.find_ap_netxml(filepath, 'TARGET') == TARGET
+    assert airodump.find_ap_netxml(filepath, 'missing') is None
+
+
+def test_find_ap_netxml_ranks_like_scan_database(tmp_path):
+    filepath = netxml(tmp_path, 'aps', [
+        ('AA:00:00:00:00:01', 'MAISON', '1', -40, []),
+        ('AA:00:00:00:00:02', 'AIS-LAB', '6', -70, []),
+        ('AA:00:00:00:00:03', 'AIS-LAB', '11', -60, []),
+        ('AA:00:00:00:00:04', 'XAIS', '6', -20, [])])
+    airodump = Airodump(0, ArtifactManager(str(tmp_path / 'out')))
+    db = ScanDatabase()
+    db.merge(airodump.iter_networks_netxml(filepath))
+
+    for query in ('AIS', 'ais-lab', 'MAISON', 'AA:00:00:00:00:04', '00:00:02', 'missing'):
+        ap = db.find(query)
+        assert airodump.find_ap_netxml(filepath, query) == (None if ap is None else ap.as_tuple())
+    assert airodump.find_ap_netxml(filepath, 'AIS')[0] == 'AA:00:00:00:00:03'
+
+
+def test_truncated_netxml_is_parsed_partially(tmp_path):
+    filepath = netxml(tmp_path, 'aps', fixtures.random_networks(20))
+    with open(filepath) as xmlfile:
+        data = xmlfile.read()
+    with open(filepath, 'w') as xmlfile:
+        xmlfile.write(data[:len(data) // 2])
+
+    aps = Airodump(0, ArtifactManager(str(tmp_path / 'out'))).parse_aps_netxml(filepath)
+    assert 0 < len(aps) < 20
+
+
+def test_search_ap_returns_when_ap_appears(tmp_path, replay):
+    noise = netxml(tmp_path, 'noise', fixtures.random_networks(10))
+    found = netxml(tmp_path, 'found', fixtures.random_networks(10, target=TARGET))
+    replay.add_capture([(0.0, noise), (1.0, found)])
+
+    db = ScanDatabase()
+    airodump = Airodump(0, ArtifactManager(str(tmp_path / 'out')))
+    assert airodump.search_ap('wlan0mon', TARGET[1], proc_timeout=5, poll_interval=0.01, db=db) == TARGET
+    assert db.get(TARGET[0]) is not None
+
+
+def test_search_ap_times_out(tmp_path, replay):
+    replay.add_capture([(0.0, netxml(tmp_path, 'noise', fixtures.random_networks(10)))])
+    airodump = Airodump(0, ArtifactManager(str(tmp_path / 'out')))
+    assert airodump.search_ap('wlan0mon', TARGET[1], proc_timeout=0.2, poll_interval=0.01) is None
+
+
+def test_session_finds_clients(tmp_path, replay):
+    replay.add_capture([(0.0, netxml(tmp_path, 'aps', fixtures.random_networks(5, target=TARGET)))])
+    airodump = Airodump(0, ArtifactManager(str(tmp_path / 'out')))
+    with airodump.session('wlan0mon', TARGET[2], TARGET[0]) as session:
+        clients = session.wait_for_clients(TARGET[0], timeout=5, poll_interval=0.01)
+    assert clients == ['0A:00:00:00:00:00']
@@ -0,0 +1,96 @@
+import os
+import time
+
+from paircrack import Airodump, ArtifactManager
+
+
+def write(filepath, size, mtime=None):
+    with open(filepath, 'wb') as f:
+        f.write(bytes(size))
+    if mtime is not None:
+        os.utime(filepath, (mtime, mtime))
+
+
+def test_prefixes_are_unique(tmp_path):
+    artifacts = ArtifactManager(str(tmp_path))
+    assert artifacts.prefix('dump') != artifacts.prefix('dump')
+    assert os.path.dirname(artifacts.prefix('dump')) == artifacts.rundir
+
+
+def test_quota_deletes_oldest_first(tmp_path):
+    artifacts = ArtifactManager(str(tmp_path), quota_mb=1)
+    files = [artifacts.path(f'file{i}') for i in range(3)]
+    for filepath in files:
+        write(filepath, 400 * 1024)
+
+    assert artifacts.enforce_quota() == [files[0]]
+    assert not os.path.exists(files[0])
+    assert artifacts.usage() == 800 * 1024
+
+
+def test_quota_keeps_files_in_use(tmp_path):
+    artifacts = ArtifactManager(str(tmp_path), quota_mb=1)
+    files = [artifacts.path(f'file{i}') for i in range(3)]
+    for filepath in files:
+        write(filepath, 400 * 1024)
+
+    assert artifacts.enforce_quota(keep=[files[0]]) == [files[1]]
+    assert os.path.exists(files[0])
+
+
+def test_quota_rotates_earlier_runs(tmp_path):
+    olddir = tmp_path / 'run-old'
+    olddir.mkdir()
+    write(olddir / 'old.cap', 600 * 1024, mtime=1000)
+    write(tmp_path / 'unrelated', 600 * 1024)
+
+    artifacts = ArtifactManager(str(tmp_path), quota_mb=1)
+    newfile = artifacts.path('new.cap')
+    write(newfile, 600 * 1024)
+
+    assert artifacts.enforce_quota() == [str(olddir / 'old.cap')]
+    assert not olddir.exists()
+    assert (tmp_path / 'unrelated').exists()
+    assert os.path.exists(newfile)
+
+
+def test_no_quota(tmp_path):
+    artifacts = ArtifactManager(str(tmp_path), quota_mb=None)
+    write(artifacts.path('big'), 2 * 1024**2)
+    assert artifacts.enforce_quota() == []
+
+
+def test_active_files_are_kept_until_released(tmp_path):
+    artifacts = ArtifactManager(str(tmp_path), quota_mb=1)
+    capfile = artifacts.prefix('dump') + '-01.cap'
+    artifacts.track(capfile, active=True)
+    write(capfile, 400 * 1024)
+    later = artifacts.path('later')
+    write(later, 800 * 1024)
+
+    assert artifacts.enforce_quota() == [later]
+    write(capfile, 1100 * 1024)
+    assert artifacts.usage() == 1100 * 1024
+    assert artifacts.enforce_quota() == []
+
+    artifacts.release(capfile)
+    assert artifacts.enforce_quota() == [capfile]
+    assert artifacts.usage() == 0
+
+
+def test_new_capture_keeps_running_session(tmp_path, replay):
+    capfile = tmp_path / 'big.cap'
+    write(capfile, 600 * 1024)
+    replay.add_capture([], str(capfile))
+    airodump = Airodump(0, ArtifactManager(str(tmp_path / 'out'), quota_mb=1))
+
+    with airodump.session('wlan0mon') as first:
+        time.sleep(0.05)
+        assert os.path.getsize(first.capfile) == 600 * 1024
+        with airodump.session('wlan0mon') as second:
+            time.sleep(0.05)
+            with airodump.session('wlan0mon', pcap=False):
+                assert os.path.exists(first.capfile) and os.path.exists(second.capfile)
+    # Released when closed, so the next capture may rotate them
+    with airodump.session('wlan0mon', pcap=False):
+        assert not os.path.exists(first.capfile)
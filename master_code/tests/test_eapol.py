@@ -0,0 +1,78 @@
+from paircrack import fixtures
+from paircrack import EapolScanner
+
+
+AP = bytes.fromhex('0e0000000001')
+STA_A = bytes.fromhex('0a0000000001')
+STA_B = bytes.fromhex('0a0000000002')
+BSSID = '0E:00:00:00:00:01'
+
+
+def scanner_of(tmp_path, frames):
+    capfile = tmp_path / 'test.cap'
+    fixtures.write_pcap(capfile, frames)
+    return EapolScanner(str(capfile))
+
+
+def test_full_handshake(tmp_path):
+    frames = [fixtures.data_frame(AP, STA_A)] * 5 + fixtures.handshake_frames(AP, STA_A)
+    scanner = scanner_of(tmp_path, frames)
+    assert scanner.handshake_messages(BSSID) == {1, 2, 3, 4}
+    assert scanner.has_handshake(BSSID)
+    assert scanner.has_handshake(BSSID.lower(), '0A:00:00:00:00:01')
+
+
+def test_messages_of_two_stations_are_not_paired(tmp_path):
+    m1, m2, _, _ = fixtures.handshake_frames(AP, STA_A)
+    _, other_m2, _, _ = fixtures.handshake_frames(AP, STA_B)
+    scanner = scanner_of(tmp_path, [m1, other_m2])
+    assert scanner.handshake_messages(BSSID) == {1, 2}
+    assert not scanner.has_handshake(BSSID)
+
+
+def test_m2_and_m3_are_enough(tmp_path):
+    _, m2, m3, _ = fixtures.handshake_frames(AP, STA_A)
+    assert scanner_of(tmp_path, [m2, m3]).has_handshake(BSSID)
+
+
+def test_replay_counters_must_match(tmp_path):
+    m1, _, _, _ = fixtures.handshake_frames(AP, STA_A, counter=1)
+    _, m2, _, _ = fixtures.handshake_frames(AP, STA_A, counter=5)
+    assert not scanner_of(tmp_path, [m1, m2]).has_handshake(BSSID)
+
+
+def test_group_key_messages_are_ignored(tmp_path):
+    m1, _, _, _ = fixtures.handshake_frames(AP, STA_A)
+    group_m2 = fixtures.eapol_frame(AP, STA_A, 0x0312, False)
+    scanner = scanner_of(tmp_path, [m1, group_m2])
+    assert scanner.handshake_messages(BSSID) == {1}
+    assert not scanner.has_handshake(BSSID)
+
+
+def test_incremental_scan(tmp_path):
+    m1, m2, m3, m4 = fixtures.handshake_frames(AP, STA_A)
+    capfile = tmp_path / 'test.cap'
+    fixtures.write_pcap(capfile, [fixtures.data_frame(AP, STA_A), m1])
+    scanner = EapolScanner(str(capfile))
+    assert not scanner.has_handshake(BSSID)
+
+    fixtures.write_pcap(capfile, [m2], append=True)
+    assert scanner.has_handshake(BSSID)
+    assert scanner.offset == capfile.stat().st_size
+
+
+def test_truncated_record_is_read_later(tmp_path):
+    m1, m2, _, _ = fixtures.handshake_frames(AP, STA_A)
+    capfile = tmp_path / 'test.cap'
+    fixtures.write_pcap(capfile, [m1, m2])
+    data = capfile.read_bytes()
+    capfile.write_bytes(data[:-10])
+
+    scanner = EapolScanner(str(capfile))
+    assert scanner.handshake_messages(BSSID) == {1}
+    capfile.write_bytes(data)
+    assert scanner.has_handshake(BSSID)
+
+
+def test_missing_file(tmp_path):
+    assert not EapolScanner(str(tmp_path / 'missing.cap')).has_handshake(BSSID)
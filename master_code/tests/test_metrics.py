@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+from paircrack import Tracer
+
+
+def test_spans_nest_and_record_errors():
+    tracer = Tracer()
+    with tracer.span('attack'):
+        with tracer.span('phase.scan', aps=3):
+            pass
+        with pytest.raises(ValueError):
+            with tracer.span('phase.crack'):
+                raise ValueError
+
+    spans = {span.name: span for span in tracer.spans}
+    assert spans['phase.scan'].parent == 'attack'
+    assert spans['phase.scan'].attrs == {'aps': 3}
+    assert spans['phase.crack'].attrs == {'error': 'ValueError'}
+    assert spans['attack'].parent is None
+    assert tracer.summary()['attack']['count'] == 1
+
+
+def test_export_writes_each_span_once(tmp_path):
+    tracer = Tracer()
+    filepath = tmp_path / 'metrics.jsonl'
+    with tracer.span('first'):
+        pass
+    assert tracer.export(filepath) == 1
+    with tracer.span('second'):
+        pass
+    assert tracer.export(filepath) == 1
+
+    lines = [json.loads(line) for line in filepath.read_text().splitlines()]
+    assert [line['name'] for line in lines] == ['first', 'second']
+    assert all(line['run'] == tracer.run_id for line in lines)
